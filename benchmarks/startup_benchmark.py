@@ -0,0 +1,118 @@
+"""
+    Startup benchmark for the scraper and upload entry points.
+
+    Runs each entry point with `--help` under `python -X importtime`, reports the
+    wall-clock time and the slowest top-level imports, and exits non-zero when a
+    command exceeds its time budget or imports a module it should only load lazily.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from typing import List, NamedTuple, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must never be imported just to parse arguments
+HEAVY_MODULES = ("pandas", "torch", "transformers", "selenium", "webdriver_manager", "PIL", "numpy")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+class EntryPoint(NamedTuple):
+    name: str
+    args: Tuple[str, ...]
+    budget: float
+
+
+ENTRY_POINTS = (
+    EntryPoint("amazon_review_scraper", ("-m", "amazon_review_scraper", "--help"), 0.5),
+    EntryPoint("walmart_review_scraper", ("-m", "walmart_review_scraper", "--help"), 0.8),
+    EntryPoint("bestbuy_review_scraper", ("-m", "bestbuy_review_scraper", "--help"), 0.8),
+    EntryPoint("worker", ("-m", "amazon_review_scraper.worker", "--help"), 0.8),
+    EntryPoint("upload_products", ("upload_products.py", "--help"), 0.5),
+    EntryPoint("upload_reviews", ("upload_reviews.py", "--help"), 0.5),
+    EntryPoint("update_summary", ("update_summary.py", "--help"), 0.5),
+)
+
+
+class StartupResult(NamedTuple):
+    entry_point: EntryPoint
+    wall_time: float
+    slowest: List[Tuple[str, float]]
+    heavy_imports: List[str]
+    returncode: int
+
+
+def measure(entry_point: EntryPoint, runs: int) -> StartupResult:
+    """Runs an entry point `runs` times and keeps the fastest run."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(ROOT, "src"), env.get("PYTHONPATH")]))
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", *entry_point.args],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_time = time.perf_counter() - started
+        if best is None or wall_time < best[0]:
+            best = (wall_time, process)
+
+    wall_time, process = best
+    top_level = []
+    imported = set()
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        imported.add(module.split(".")[0])
+        # top-level imports have the smallest indentation in -X importtime output
+        if len(indent) <= 1:
+            top_level.append((module, int(cumulative) / 1e6))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return StartupResult(
+        entry_point=entry_point,
+        wall_time=wall_time,
+        slowest=top_level[:5],
+        heavy_imports=sorted(imported.intersection(HEAVY_MODULES)),
+        returncode=process.returncode,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the startup time of the CLI entry points")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per entry point, the fastest one is reported")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every time budget, e.g. on slow CI hosts")
+    args = parser.parse_args()
+
+    failures = []
+    for entry_point in ENTRY_POINTS:
+        result = measure(entry_point, args.runs)
+        budget = entry_point.budget * args.scale
+        print(f"{entry_point.name:<24} {result.wall_time * 1000:7.0f} ms (budget {budget * 1000:.0f} ms)")
+        for module, seconds in result.slowest:
+            print(f"    {module:<40} {seconds * 1000:7.1f} ms")
+        if result.returncode != 0:
+            failures.append(f"{entry_point.name} exited with {result.returncode}")
+        if result.heavy_imports:
+            failures.append(f"{entry_point.name} imports {', '.join(result.heavy_imports)} at startup")
+        if result.wall_time > budget:
+            failures.append(f"{entry_point.name} took {result.wall_time:.2f}s, budget is {budget:.2f}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
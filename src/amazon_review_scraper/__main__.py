@@ -3,15 +3,25 @@
 """
 
 import logging
+import sys
 
-import click
+from typing import List, Sequence
 
-from amazon_review_scraper.collector import AmazonReviewDataCollector
+import click
 
 
 logging.basicConfig(level=logging.INFO)
 
 
+def _split_codes(codes: Sequence[str]) -> List[str]:
+    # 如果只提供了一個元素，檢查是否包含逗號
+    if len(codes) == 1:
+        if "," in codes[0]:
+            return [code.strip() for code in codes[0].split(",")]
+        return [codes[0]]
+    return list(codes)
+
+
 @click.command()
 @click.option(
     "--asin-codes",
@@ -21,24 +31,33 @@ logging.basicConfig(level=logging.INFO)
     help="The ASIN code(s) of the product(s) for which to scrape Amazon reviews. "
          "You can pass a single code, a comma-separated list, or multiple options."
 )
+@click.option(
+    "--zip-codes",
+    multiple=True,
+    type=str,
+    help="Scrape only the price and availability of the products in each of these US zip code(s) "
+         "into one price matrix file, instead of the reviews."
+)
 @click.option(
     "--timestamp",
     required=True,
     type=str,
     help="The timestamp string used as a prefix for output files."
 )
-def scrape_amazon_reviews(asin_codes, timestamp) -> None:
-    # 如果只提供了一個元素，檢查是否包含逗號
-    if len(asin_codes) == 1:
-        if "," in asin_codes[0]:
-            asin_codes = [code.strip() for code in asin_codes[0].split(",")]
-        else:
-            asin_codes = [asin_codes[0]]
-    else:
-        asin_codes = list(asin_codes)
-    
+def scrape_amazon_reviews(asin_codes: Sequence[str], zip_codes: Sequence[str], timestamp: str) -> None:
+    asin_code_list = _split_codes(asin_codes)
+    zip_code_list = _split_codes(zip_codes)
+
+    # collector pulls in pandas and selenium, import it only once arguments are valid
+    from amazon_review_scraper.collector import AmazonReviewDataCollector
+
     collector = AmazonReviewDataCollector()
-    collector.collect_amazon_review_data(asin_codes, timestamp)
+    if zip_code_list:
+        ok = collector.collect_amazon_price_matrix(asin_code_list, zip_code_list, timestamp)
+    else:
+        ok = collector.collect_amazon_review_data(asin_code_list, timestamp)
+    # lets schedulers detect runs with failed products or regions
+    sys.exit(0 if ok else 1)
 
 
 if __name__ == "__main__":
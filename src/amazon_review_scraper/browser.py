@@ -0,0 +1,333 @@
+"""
+    Module for the lifecycle of the Chrome webdrivers used to scrape Amazon.
+
+    Headless Chrome grows with every page it renders. ManagedChromeDriver counts
+    page loads and samples the memory of the chromedriver process tree, and
+    replaces the browser with a fresh one once a page or memory limit is reached.
+    The session cookies (login, delivery location) are carried over to the new
+    browser. Every browser is quit on normal exit, SIGTERM and SIGINT, after
+    which its manager refuses to start new ones, and browsers left behind by
+    crashed runs are killed before new ones start.
+
+    Memory sampling and orphan reaping read /proc and are skipped on systems
+    without it.
+"""
+
+import atexit
+import logging
+import os
+import signal
+import sys
+import threading
+import weakref
+
+from types import FrameType
+from typing import Any, Callable, Dict, List
+
+from amazon_review_scraper.exception import BaseException
+
+
+# marker added to the Chrome command line, names the Python process owning the browser
+OWNER_PID_ARG = "--scraper-owner-pid"
+AMAZON_HOME_URL = "https://www.amazon.com"
+
+_PROC_DIR = "/proc"
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def owner_pid_argument() -> str:
+    """Returns the Chrome argument that marks a browser as started by this process."""
+    return f"{OWNER_PID_ARG}={os.getpid()}"
+
+
+def _read_proc_file(pid: int, name: str) -> str | None:
+    try:
+        with open(os.path.join(_PROC_DIR, str(pid), name), "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+
+
+def _parent_pids() -> Dict[int, int]:
+    """Returns the parent pid of every running process."""
+    parents = {}
+    for entry in os.listdir(_PROC_DIR):
+        if not entry.isdigit():
+            continue
+        stat = _read_proc_file(int(entry), "stat")
+        if stat:
+            # the command name in parentheses may contain spaces, fields after it are fixed
+            parents[int(entry)] = int(stat.rsplit(")", 1)[1].split()[1])
+    return parents
+
+
+def process_tree_rss(pid: int) -> int | None:
+    """
+    Returns the summed resident memory in bytes of a process and all its descendants,
+    or None if it cannot be read. Shared pages count once per process, so this
+    overestimates, which is the safe side for a ceiling.
+    """
+    if not os.path.isdir(_PROC_DIR):
+        return None
+    children: Dict[int, List[int]] = {}
+    for child, parent in _parent_pids().items():
+        children.setdefault(parent, []).append(child)
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        statm = _read_proc_file(current, "statm")
+        if statm:
+            total += int(statm.split()[1]) * _PAGE_SIZE
+        stack.extend(children.get(current, ()))
+    return total
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def reap_orphaned_browsers(logger: logging.Logger | None = None) -> int:
+    """
+    Kills Chrome browsers whose owning scraper process is gone, together with their chromedriver.
+    Returns the number of killed processes.
+    """
+    logger = logger if logger else logging.getLogger(__name__)
+    if not os.path.isdir(_PROC_DIR):
+        return 0
+    marker = f"{OWNER_PID_ARG}="
+    victims = set()
+    for pid, parent in _parent_pids().items():
+        args = (_read_proc_file(pid, "cmdline") or "").split("\0")
+        owner = next((arg[len(marker):] for arg in args if arg.startswith(marker)), None)
+        if not owner or not owner.isdigit() or _pid_alive(int(owner)):
+            continue
+        victims.add(pid)
+        parent_cmdline = _read_proc_file(parent, "cmdline") or ""
+        if "chromedriver" in parent_cmdline:
+            victims.add(parent)
+
+    for pid in victims:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            continue
+    if victims:
+        logger.warning(f"Killed {len(victims)} Chrome and chromedriver processes left by crashed runs.")
+    return len(victims)
+
+
+class BrowserClosedError(BaseException):
+    message = "The managed Chrome webdriver was quit and starts no new browser."
+
+
+class ManagedChromeDriver:
+    """A Chrome webdriver that is replaced after a number of pages or above a memory ceiling"""
+
+    def __init__(
+        self,
+        factory: Callable,
+        setup: Callable | None = None,
+        max_pages: int = 200,
+        max_rss_bytes: int | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        """
+        Args:
+            factory (Callable): Starts a new webdriver, its Chrome should get owner_pid_argument().
+            setup (Callable): Prepares a new browser session (login, locale). Runs on the first start,
+                and on recycling if the cookies of the old browser cannot be carried over.
+            max_pages (int): Page loads after which the browser is replaced.
+            max_rss_bytes (int | None): Memory of the browser process tree above which it is replaced.
+        """
+        self._factory = factory
+        self._setup = setup
+        self._max_pages = max_pages
+        self._max_rss_bytes = max_rss_bytes
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._driver = None
+        self._closed = False
+        self._pages = 0
+        self.recycles = 0
+        self.peak_rss = 0
+        _register(self)
+
+    @property
+    def driver(self):
+        """
+        Returns the current webdriver, starting the browser if needed.
+
+        Raises:
+            BrowserClosedError: If the browser was quit, e.g. by a signal handler.
+        """
+        with self._lock:
+            self._ensure_open()
+            if self._driver is not None:
+                return self._driver
+        driver = self._launch()
+        # runs without the lock, so quit() from a signal handler never waits for a login
+        if self._setup:
+            self._setup(driver)
+        return driver
+
+    @property
+    def is_running(self) -> bool:
+        return self._driver is not None
+
+    def start(self):
+        """Starts the browser and prepares its session, unless it is already running."""
+        return self.driver
+
+    def _ensure_open(self) -> None:
+        if self._closed:
+            raise BrowserClosedError
+
+    def _launch(self):
+        """Starts a new browser and makes it the current one, unless the manager was closed meanwhile."""
+        driver = self._factory()
+        with self._lock:
+            if not self._closed:
+                self._driver = driver
+                self._pages = 0
+                return driver
+        self._quit_driver(driver)
+        raise BrowserClosedError
+
+    def _quit_driver(self, driver: Any) -> None:
+        try:
+            driver.quit()
+        except Exception:
+            self._logger.exception("Unable to quit Chrome webdriver.")
+
+    def rss(self) -> int | None:
+        """Returns the memory of the chromedriver process and the browsers below it."""
+        with self._lock:
+            process = getattr(getattr(self._driver, "service", None), "process", None)
+        if process is None:
+            return None
+        rss = process_tree_rss(process.pid)
+        if rss:
+            self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def checkpoint(self):
+        """
+        Counts a page load and returns the webdriver to load it with.
+        The browser is recycled first if it reached the page limit or the memory ceiling.
+
+        Raises:
+            BrowserClosedError: If the browser was quit, e.g. by a signal handler.
+        """
+        driver = self.driver
+        reason = None
+        if self._pages >= self._max_pages:
+            reason = f"{self._pages} pages"
+        elif self._max_rss_bytes:
+            rss = self.rss()
+            if rss and rss > self._max_rss_bytes:
+                reason = f"{rss / 2 ** 20:.0f} MB RSS"
+        if reason:
+            self._logger.info(f"Recycling Chrome after {reason}.")
+            self.recycle()
+            driver = self.driver
+        with self._lock:
+            self._pages += 1
+        return driver
+
+    def recycle(self) -> None:
+        """
+        Replaces the browser with a new one that continues the session of the old one.
+
+        Raises:
+            BrowserClosedError: If the browser was quit, e.g. by a signal handler.
+        """
+        with self._lock:
+            self._ensure_open()
+            old_driver, self._driver = self._driver, None
+        cookies = None
+        if old_driver is not None:
+            try:
+                cookies = old_driver.get_cookies()
+            except Exception:
+                self._logger.warning("Unable to read the cookies of the old browser, starting a new session.")
+            self._quit_driver(old_driver)
+        self.recycles += 1
+        driver = self._launch()
+        if not cookies:
+            if self._setup:
+                self._setup(driver)
+            return
+        try:
+            # cookies can only be set for the domain of the open page
+            driver.get(AMAZON_HOME_URL)
+            for cookie in cookies:
+                cookie.pop("sameSite", None)
+                driver.add_cookie(cookie)
+            driver.refresh()
+        except Exception:
+            self._ensure_open()
+            self._logger.exception("Unable to restore the browser session, starting a new session.")
+            if self._setup:
+                self._setup(driver)
+
+    def quit(self) -> None:
+        """
+        Quits the browser and its chromedriver, safe to call any number of times.
+        The manager starts no further browsers afterwards.
+        """
+        with self._lock:
+            self._closed = True
+            driver, self._driver = self._driver, None
+        if driver is not None:
+            self._quit_driver(driver)
+
+
+_live_drivers: "weakref.WeakSet[ManagedChromeDriver]" = weakref.WeakSet()
+_previous_handlers: Dict[int, object] = {}
+_handlers_lock = threading.Lock()
+_atexit_registered = False
+
+
+def quit_all() -> None:
+    """Quits every managed browser of this process."""
+    for managed in list(_live_drivers):
+        managed.quit()
+
+
+def _quit_all_and_exit(signum: int, frame: FrameType | None) -> None:
+    quit_all()
+    previous = _previous_handlers.get(signum)
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        sys.exit(128 + signum)
+
+
+def install_exit_handlers() -> None:
+    """
+    Quits every managed browser at interpreter exit and on SIGTERM and SIGINT.
+    Signal handlers can only be installed from the main thread, call this there
+    before starting browsers from worker threads.
+    """
+    global _atexit_registered
+    with _handlers_lock:
+        if not _atexit_registered:
+            atexit.register(quit_all)
+            _atexit_registered = True
+        if _previous_handlers or threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            _previous_handlers[signum] = signal.getsignal(signum)
+            signal.signal(signum, _quit_all_and_exit)
+
+
+def _register(managed: ManagedChromeDriver) -> None:
+    _live_drivers.add(managed)
+    install_exit_handlers()
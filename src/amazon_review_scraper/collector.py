@@ -4,12 +4,14 @@
 import os
 import logging
 
-from typing import List
+from contextlib import closing
+from typing import List, Sequence
 
-import pandas as pd
-
-from amazon_review_scraper.models import BaseModel
+from amazon_review_scraper.dedup import ReviewClusterIndex
+from amazon_review_scraper.journal import RunJournal
+from amazon_review_scraper.models import BaseModel, Product, Review
 from amazon_review_scraper.scraper import AmazonReviewScraper
+from amazon_review_scraper.search import ReviewSearchIndex
 
 
 DEFAULT_OUTPUT_FILE = "amazon_reviews.csv"
@@ -26,39 +28,88 @@ class AmazonReviewDataCollector:
         self._scraper = AmazonReviewScraper()
         self._output_file = output_file if output_file else DEFAULT_OUTPUT_FILE
         self._logger = logger if logger else logging.getLogger(__name__)
+        self._search_index = ReviewSearchIndex(logger=self._logger)
+        self._cluster_index = ReviewClusterIndex(logger=self._logger)
 
-    def _save_to_csv(self, datas: List[BaseModel]) -> None:
+    def _save_to_csv(self, datas: Sequence[BaseModel]) -> None:
         """Saves given list of model data into a CSV file."""
+        import pandas as pd
+
         self._logger.info(f"Writing {len(datas)} records to {self._output_file}..")
         model_obejcts = [data.model_dump() for data in datas]
         df = pd.DataFrame(model_obejcts)
         df.to_csv(self._output_file, index=False)
 
-    def collect_amazon_review_data(self, asin_codes: List[str], timestamp: str) -> None:
+    def collect_amazon_review_data(self, asin_codes: List[str], timestamp: str) -> bool:
         """
         Scrapes reviews from a given Amazon product page based on given ASIN code and stores it into a CSV file.
+        Progress is journaled per timestamp, so running the same timestamp again only scrapes unfinished ASINs.
 
         Args:
             asin_codes (List[str]): The ASIN codes of the Amazon product for which to scrape reviews.
             timestamp (str): A timestamp string in the format YYYYMMDDHHMM representing year, month, day, hour, and minute.
+        Returns:
+            False if scraping stopped because of an error or any ASIN failed, True otherwise.
         """
         self._logger.info(f"Getting Amazon reviews for ASIN codes {asin_codes}..")
+        journal = RunJournal.for_timestamp(timestamp, logger=self._logger)
         try:
-            for asin_code, product, reviews in self._scraper.scrape_amazon_products_and_reviews(asin_codes):
-                if not reviews:
-                    self._logger.info(f"No reviews found for given product {asin_code}.")
-                    continue
-                reviews_folder = os.path.join("reviews", "amazon")
-                product_folder = os.path.join("products", "amazon")
-                os.makedirs(reviews_folder, exist_ok=True)
-                os.makedirs(product_folder, exist_ok=True)
-                self._output_file = os.path.join(reviews_folder, f"{timestamp}_amazon_reviews_{asin_code}.csv")
-                self._save_to_csv(reviews)
-                self._output_file = os.path.join(product_folder, f"{timestamp}_amazon_product_{asin_code}.csv")
-                self._save_to_csv([product])
+            # closing() quits the browser even if saving a product raises
+            with closing(self._scraper.scrape_amazon_products_and_reviews(asin_codes, journal)) as results:
+                for asin_code, product, reviews in results:
+                    self._save_product(asin_code, timestamp, product, reviews)
+                    journal.mark_done(asin_code)
 
         except Exception:
             self._logger.exception(
                 f"Error when scraping Amazon products info and reviews for products {asin_codes}."
             )
+            return False
+
+        unfinished = journal.pending(asin_codes)
+        if unfinished:
+            self._logger.error(f"Amazon products {unfinished} failed, run again with timestamp {timestamp} to retry them.")
+            return False
+        return True
+
+    def collect_amazon_price_matrix(self, asin_codes: List[str], zip_codes: List[str], timestamp: str) -> bool:
+        """
+        Scrapes the price and availability of the given Amazon products in every given region and stores
+        them into one CSV file with a row per ASIN code and zip code.
+
+        Args:
+            asin_codes (List[str]): The ASIN codes of the Amazon products.
+            zip_codes (List[str]): The US zip codes of the regions to compare.
+            timestamp (str): A timestamp string in the format YYYYMMDDHHMM representing year, month, day, hour, and minute.
+        Returns:
+            False if any product could not be scraped in any region, True otherwise.
+        """
+        self._logger.info(f"Getting Amazon price matrix for ASIN codes {asin_codes} and zip codes {zip_codes}..")
+        products = self._scraper.scrape_amazon_price_matrix(asin_codes, zip_codes)
+        if not products:
+            self._logger.error(f"No Amazon prices found for products {asin_codes}.")
+            return False
+        matrix_folder = os.path.join("price_matrix", "amazon")
+        os.makedirs(matrix_folder, exist_ok=True)
+        self._output_file = os.path.join(matrix_folder, f"{timestamp}_amazon_price_matrix.csv")
+        self._save_to_csv(products)
+        return len(products) == len(asin_codes) * len(zip_codes)
+
+    def _save_product(self, asin_code: str, timestamp: str, product: Product, reviews: List[Review]) -> None:
+        """Stores the product and its reviews into CSV files and the review indexes."""
+        if not reviews:
+            self._logger.info(f"No reviews found for given product {asin_code}.")
             return
+        reviews_folder = os.path.join("reviews", "amazon")
+        product_folder = os.path.join("products", "amazon")
+        os.makedirs(reviews_folder, exist_ok=True)
+        os.makedirs(product_folder, exist_ok=True)
+        self._output_file = os.path.join(reviews_folder, f"{timestamp}_amazon_reviews_{asin_code}.csv")
+        review_dicts = [review.model_dump() for review in reviews]
+        cluster_ids = self._cluster_index.assign_clusters("amazon", asin_code, review_dicts)
+        for review, review_dict, cluster_id in zip(reviews, review_dicts, cluster_ids):
+            review.cluster_id = review_dict["cluster_id"] = cluster_id
+        self._save_to_csv(reviews)
+        self._search_index.add_reviews("amazon", asin_code, timestamp, review_dicts)
+        self._output_file = os.path.join(product_folder, f"{timestamp}_amazon_product_{asin_code}.csv")
+        self._save_to_csv([product])
@@ -2,19 +2,33 @@
     Config module for amazon_review_scraper.
 """
 
+import os
+
 from pydantic_settings import BaseSettings
 
 
 class AmazonReviewScraperSettings(BaseSettings):
     """Settings class for Amazon Review Scraper"""
 
+    # HTTP response cache shared by the Walmart and Best Buy scrapers.
+    # http_cache_mode is "default", "replay" (never touch the network) or "off".
+    http_cache_path: str = os.path.join("cache", "http_cache.sqlite3")
+    http_cache_max_bytes: int = 256 * 1024 * 1024
+    http_cache_ttl: int = 3600
+    http_cache_mode: str = "default"
+
+    # Amazon Chrome sessions are replaced after this many page loads or above this
+    # memory of the chromedriver process tree, whichever comes first.
+    chrome_max_pages: int = 200
+    chrome_max_rss_mb: int = 1536
+
     def get_amazon_product_url(self, asin_code: str) -> str:
         """Returns an Amazon product URL for a given ASIN code."""
         return f"https://www.amazon.com/dp/{asin_code}"
     
-    def get_amazon_product_reviews_url(self, asin_code: str) -> str:
-        """Returns an Amazon product URL for a given ASIN code."""
-        return f"https://www.amazon.com/product-reviews/{asin_code}/ref=cm_cr_dp_d_show_all_btm?ie=UTF8&reviewerType=all_reviews&sortBy=recent&pageNumber=1"
+    def get_amazon_product_reviews_url(self, asin_code: str, page: int = 1) -> str:
+        """Returns the URL of a page of the Amazon product reviews for a given ASIN code."""
+        return f"https://www.amazon.com/product-reviews/{asin_code}/ref=cm_cr_dp_d_show_all_btm?ie=UTF8&reviewerType=all_reviews&sortBy=recent&pageNumber={page}"
 
 
 amazon_review_scraper_settings = AmazonReviewScraperSettings()
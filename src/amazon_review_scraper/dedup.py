@@ -0,0 +1,275 @@
+"""
+    Module for clustering near-duplicate and syndicated reviews.
+
+    Each review text is reduced to a MinHash signature of its character shingles,
+    computed with NumPy for all hash functions at once. Signatures are indexed
+    with locality sensitive hashing (LSH) bands in SQLite, so a new review is only
+    compared against the few stored reviews that share a band with it, never
+    against the whole corpus. A review joins the cluster of its most similar match
+    above the threshold, or starts a new cluster.
+"""
+
+import csv
+import glob
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import zlib
+
+from typing import List, Sequence
+
+import click
+import numpy as np
+
+from amazon_review_scraper.search import DEFAULT_INDEX_PATH, ReviewSearchIndex, review_key
+
+
+DEFAULT_CLUSTER_INDEX_PATH = os.path.join("reviews", "review_clusters.sqlite3")
+DEFAULT_THRESHOLD = 0.7
+
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows make pairs candidates from a Jaccard similarity of about
+# (1/32) ** (1/4) = 0.42 on, well below the threshold: 87% of the pairs at 0.5
+# and 99% at 0.6 share a band, the signature comparison does the actual cut
+NUM_BANDS = 32
+SHINGLE_SIZE = 5
+# caps the comparisons for very common texts
+MAX_CANDIDATES = 1000
+# shorter texts ("Great product!", "Love it") are written independently by many
+# customers, they are never treated as copies of each other
+MIN_SHINGLES = 40
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_random = np.random.RandomState(1)
+# fixed seed, signatures must stay comparable across runs
+_PERMUTATION_A = _random.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    review_key TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    ident_code TEXT NOT NULL,
+    cluster_id TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_bands (
+    bucket INTEGER NOT NULL,
+    signature_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lsh_bands_bucket ON lsh_bands (bucket);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _shingles(text: str) -> set:
+    """
+    Returns the character shingles of a review text.
+    Case, punctuation and whitespace are ignored so lightly edited copies still match.
+    """
+    normalized = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+    if not normalized:
+        return set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+
+
+def minhash_signature(text: str) -> np.ndarray | None:
+    """Returns the MinHash signature of a review text, or None if the text is empty."""
+    shingles = _shingles(text)
+    return _signature(shingles) if shingles else None
+
+
+def _signature(shingles: set) -> np.ndarray:
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    ) % _MERSENNE_PRIME
+    # (shingles x permutations) universal hashes, minimum over the shingles
+    permuted = (hashes[:, None] * _PERMUTATION_A + _PERMUTATION_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_buckets(signature: np.ndarray) -> List[int]:
+    """Returns one LSH bucket per band, salted with the band number."""
+    rows = NUM_PERMUTATIONS // NUM_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(NUM_BANDS)
+    ]
+
+
+class ReviewClusterIndex:
+    """Incremental near-duplicate clustering of reviews across sources and products"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CLUSTER_INDEX_PATH,
+        threshold: float = DEFAULT_THRESHOLD,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._threshold = threshold
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._rebuild_bands()
+
+    def _rebuild_bands(self) -> None:
+        """Recomputes the LSH buckets of every stored signature if the index was built with other bands."""
+        row = self._conn.execute("SELECT value FROM settings WHERE name = 'num_bands'").fetchone()
+        if row and row[0] == NUM_BANDS:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM lsh_bands")
+            signatures = self._conn.execute("SELECT id, signature FROM signatures").fetchall()
+            for signature_id, signature in signatures:
+                self._conn.executemany(
+                    "INSERT INTO lsh_bands (bucket, signature_id) VALUES (?, ?)",
+                    [(bucket, signature_id) for bucket in _band_buckets(np.frombuffer(signature, dtype=np.uint32))],
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO settings (name, value) VALUES ('num_bands', ?)", (NUM_BANDS,)
+            )
+        if signatures:
+            self._logger.info(f"Rebuilt the LSH bands of {len(signatures)} reviews for {NUM_BANDS} bands.")
+
+    def _best_match(self, signature: np.ndarray, buckets: List[int]) -> str | None:
+        """Returns the cluster of the most similar indexed review above the threshold."""
+        candidates = self._conn.execute(
+            "SELECT s.cluster_id, s.signature FROM signatures s WHERE s.id IN"
+            f" (SELECT signature_id FROM lsh_bands WHERE bucket IN ({','.join('?' * len(buckets))}))"
+            " LIMIT ?",
+            [*buckets, MAX_CANDIDATES],
+        ).fetchall()
+        if not candidates:
+            return None
+        matrix = np.frombuffer(b"".join(row[1] for row in candidates), dtype=np.uint32).reshape(len(candidates), -1)
+        # the share of equal MinHash values estimates the Jaccard similarity
+        similarity = (matrix == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return candidates[best][0] if similarity[best] >= self._threshold else None
+
+    def assign_clusters(self, source: str, ident_code: str, reviews: Sequence[dict]) -> List[str]:
+        """
+        Adds reviews to the index and returns their cluster IDs.
+
+        Reviews seen before keep their cluster. Reviews without text or shorter than MIN_SHINGLES
+        shingles get a cluster of their own and are not indexed for matching.
+
+        Args:
+            source (str): Retailer the reviews were scraped from, e.g. "amazon".
+            ident_code (str): The product code (ASIN, Walmart or Best Buy id).
+            reviews (Sequence[dict]): Reviews with the fields of the Review model.
+        """
+        cluster_ids = []
+        new_reviews = 0
+        with self._conn:
+            for review in reviews:
+                key = review_key(source, ident_code, review)
+                known = self._conn.execute(
+                    "SELECT cluster_id FROM signatures WHERE review_key = ?", (key,)
+                ).fetchone()
+                if known:
+                    cluster_ids.append(known[0])
+                    continue
+
+                shingles = _shingles(str(review.get("content") or ""))
+                if len(shingles) < MIN_SHINGLES:
+                    cluster_ids.append(key[:16])
+                    continue
+                signature = _signature(shingles)
+
+                new_reviews += 1
+                buckets = _band_buckets(signature)
+                cluster_id = self._best_match(signature, buckets) or key[:16]
+                cursor = self._conn.execute(
+                    "INSERT INTO signatures (review_key, source, ident_code, cluster_id, signature) VALUES (?, ?, ?, ?, ?)",
+                    (key, source, ident_code, cluster_id, signature.tobytes()),
+                )
+                self._conn.executemany(
+                    "INSERT INTO lsh_bands (bucket, signature_id) VALUES (?, ?)",
+                    [(bucket, cursor.lastrowid) for bucket in buckets],
+                )
+                cluster_ids.append(cluster_id)
+
+        duplicates = len(reviews) - len(set(cluster_ids))
+        self._logger.info(
+            f"Clustered {new_reviews} new {source} reviews for {ident_code}, {duplicates} near-duplicates in this batch."
+        )
+        return cluster_ids
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@click.command()
+@click.option(
+    "--index-path",
+    default=DEFAULT_CLUSTER_INDEX_PATH,
+    show_default=True,
+    type=str,
+    help="Location of the cluster index."
+)
+@click.option(
+    "--threshold",
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    type=float,
+    help="Estimated Jaccard similarity above which two reviews are near-duplicates, at least about 0.45."
+)
+@click.option(
+    "--search-index-path",
+    default=DEFAULT_INDEX_PATH,
+    show_default=True,
+    type=str,
+    help="Location of the review search index whose cluster IDs are updated."
+)
+def backfill_clusters(index_path: str, threshold: float, search_index_path: str) -> None:
+    """
+    Assigns cluster IDs to every existing review CSV file, adds a cluster_id column to it
+    and updates the cluster IDs of the reviews in the search index.
+    """
+    index = ReviewClusterIndex(index_path, threshold)
+    search_index = ReviewSearchIndex(search_index_path)
+    # oldest files first, so the first copy of a syndicated review names its cluster
+    filepaths = sorted(
+        glob.glob(os.path.join("reviews", "*", "*_reviews_*.csv")), key=lambda path: os.path.basename(path)
+    )
+    for filepath in filepaths:
+        filename = os.path.basename(filepath)
+        source = os.path.basename(os.path.dirname(filepath))
+        ident_code = filename.split("_")[-1].split(".")[0]
+        with open(filepath, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            continue
+        for row, cluster_id in zip(rows, index.assign_clusters(source, ident_code, rows)):
+            row["cluster_id"] = cluster_id
+        search_index.set_cluster_ids(source, ident_code, rows)
+        with open(filepath, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    index.close()
+    search_index.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    backfill_clusters()
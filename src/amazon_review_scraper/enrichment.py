@@ -0,0 +1,363 @@
+"""
+    Module for enriching scraped reviews with sentiment and aspect labels.
+
+    Reviews are scored locally with a small sentiment model on CPU. Inference is
+    batched by token length and every result is cached on disk by content hash,
+    so a review text is only ever scored once per model.
+"""
+
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import click
+
+from amazon_review_scraper.models import ReviewEnrichment
+
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
+
+DEFAULT_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+DEFAULT_CACHE_PATH = os.path.join("enriched", "enrichment_cache.sqlite3")
+DEFAULT_MAX_LENGTH = 256
+DEFAULT_MAX_BATCH_TOKENS = 4096
+DEFAULT_WORKERS = 2
+
+# Keywords used to decide which sentences of a review talk about which aspect.
+ASPECT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "quality": (
+        "quality", "broke", "broken", "durable", "sturdy", "cheap", "flimsy",
+        "defective", "well made", "build", "material", "stopped working", "works great",
+    ),
+    "shipping": (
+        "shipping", "shipped", "delivery", "delivered", "arrived", "package",
+        "packaging", "box", "late", "on time",
+    ),
+    "price": (
+        "price", "priced", "cost", "expensive", "cheaper", "worth", "value",
+        "money", "deal", "sale", "$",
+    ),
+    "support": (
+        "support", "customer service", "warranty", "refund", "return", "replacement",
+        "contacted", "seller", "exchange",
+    ),
+}
+
+POSITIVE_THRESHOLD = 0.6
+NEGATIVE_THRESHOLD = 0.4
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _keyword_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    """Matches whole keywords only, so "box" does not match "Xbox" nor "late" "chocolate"."""
+    parts = [
+        (r"\b" if keyword[0].isalnum() else "") + re.escape(keyword) + (r"\b" if keyword[-1].isalnum() else "")
+        for keyword in keywords
+    ]
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+_ASPECT_PATTERNS: Dict[str, re.Pattern] = {
+    aspect: _keyword_pattern(keywords) for aspect, keywords in ASPECT_KEYWORDS.items()
+}
+
+
+def review_content_hash(content: str, model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """Returns the cache key of a review text for the given model."""
+    normalized = " ".join(content.split()).lower()
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+def _sentiment_label(score: float) -> str:
+    if score >= POSITIVE_THRESHOLD:
+        return "positive"
+    if score <= NEGATIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def _aspect_sentences(content: str) -> Dict[str, str]:
+    """Groups the sentences of a review by the aspects they mention."""
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(content) if s.strip()]
+    grouped: Dict[str, List[str]] = {}
+    for sentence in sentences:
+        for aspect, pattern in _ASPECT_PATTERNS.items():
+            if pattern.search(sentence):
+                grouped.setdefault(aspect, []).append(sentence)
+    return {aspect: " ".join(parts) for aspect, parts in grouped.items()}
+
+
+class EnrichmentCache:
+    """SQLite backed cache of review enrichment results keyed by content hash."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment ("
+            " content_hash TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, ReviewEnrichment]:
+        """Returns cached results for the given hashes, skipping unknown ones."""
+        found: Dict[str, ReviewEnrichment] = {}
+        hashes = list(content_hashes)
+        # stay well below SQLite's bound parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT content_hash, payload FROM enrichment WHERE content_hash IN ({placeholders})",
+                chunk,
+            )
+            for content_hash, payload in rows:
+                found[content_hash] = ReviewEnrichment.model_validate_json(payload)
+        return found
+
+    def put_many(self, enrichments: Iterable[ReviewEnrichment]) -> None:
+        """Stores the given results in the cache."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO enrichment (content_hash, payload, created_at) VALUES (?, ?, ?)",
+            [(e.content_hash, e.model_dump_json(), now) for e in enrichments],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ReviewEnricher:
+    """Classifies review sentiment and per-aspect sentiment with a local CPU model."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache: EnrichmentCache | None = None,
+        workers: int = DEFAULT_WORKERS,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self._model_name = model_name
+        self._cache = cache if cache else EnrichmentCache()
+        self._workers = max(1, workers)
+        self._max_length = max_length
+        self._max_batch_tokens = max(max_batch_tokens, max_length)
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._tokenizer: "PreTrainedTokenizerBase | None" = None
+        self._model: "PreTrainedModel | None" = None
+        self._positive_index = 1
+
+    def _load_model(self) -> Tuple["PreTrainedTokenizerBase", "PreTrainedModel"]:
+        """Loads the tokenizer and model on first use and returns them."""
+        if self._tokenizer is not None and self._model is not None:
+            return self._tokenizer, self._model
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        # split the CPU cores between the inference workers
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // self._workers))
+        tokenizer = AutoTokenizer.from_pretrained(self._model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(self._model_name)
+        model.eval()
+        labels = {label.upper(): index for index, label in model.config.id2label.items()}
+        self._positive_index = labels.get("POSITIVE", model.config.num_labels - 1)
+        self._tokenizer, self._model = tokenizer, model
+        self._logger.info(f"Loaded sentiment model {self._model_name}.")
+        return tokenizer, model
+
+    def _make_batches(self, input_ids: List[List[int]]) -> List[List[int]]:
+        """
+        Groups text indices into batches of similar token length.
+        A batch is closed once its padded size would exceed the token budget.
+        """
+        lengths = [len(ids) for ids in input_ids]
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        longest = 0
+        for index in sorted(range(len(input_ids)), key=lambda i: lengths[i]):
+            longest_with_index = max(longest, lengths[index])
+            if batch and longest_with_index * (len(batch) + 1) > self._max_batch_tokens:
+                batches.append(batch)
+                batch, longest_with_index = [], lengths[index]
+            batch.append(index)
+            longest = longest_with_index
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _score_batch(self, model: "PreTrainedModel", encoded: dict) -> List[float]:
+        """Returns the positive-class probability of each text of an encoded batch."""
+        import torch
+
+        with torch.inference_mode():
+            logits = model(**encoded).logits
+        return logits.softmax(dim=-1)[:, self._positive_index].tolist()
+
+    def _score(self, texts: List[str]) -> List[float]:
+        """
+        Scores texts with dynamically sized batches spread over the worker pool.
+        All tokenization happens on the calling thread, a fast tokenizer must not be
+        used from several threads at once, the workers only receive tensors.
+        """
+        tokenizer, model = self._load_model()
+        scores: List[float] = [0.0] * len(texts)
+        input_ids = tokenizer(texts, truncation=True, max_length=self._max_length)["input_ids"]
+        batches = self._make_batches(input_ids)
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = {
+                pool.submit(
+                    self._score_batch,
+                    model,
+                    tokenizer.pad({"input_ids": [input_ids[i] for i in batch]}, return_tensors="pt"),
+                ): batch
+                for batch in batches
+            }
+            for future, batch in futures.items():
+                for index, score in zip(batch, future.result()):
+                    scores[index] = score
+        return scores
+
+    def enrich(self, contents: List[str]) -> List[ReviewEnrichment]:
+        """
+        Classifies the sentiment and aspects of each review text.
+
+        Args:
+            contents (List[str]): Review texts, e.g. the `content` field of scraped reviews.
+        Returns:
+            A ReviewEnrichment for each given text, in the same order.
+        """
+        hashes = [review_content_hash(content, self._model_name) for content in contents]
+        results = self._cache.get_many(set(hashes))
+        pending = {h: c for h, c in zip(hashes, contents) if h not in results}
+        self._logger.info(
+            f"Enriching {len(contents)} reviews, {len(contents) - len(pending)} served from cache.."
+        )
+
+        if pending:
+            self._load_model()
+            started = time.perf_counter()
+            # each review contributes its full text plus one text per mentioned aspect
+            units: List[Tuple[str, str | None]] = []
+            texts: List[str] = []
+            for content_hash, content in pending.items():
+                units.append((content_hash, None))
+                texts.append(content)
+                for aspect, text in _aspect_sentences(content).items():
+                    units.append((content_hash, aspect))
+                    texts.append(text)
+
+            scores = self._score(texts)
+            review_scores: Dict[str, float] = {}
+            aspects: Dict[str, Dict[str, str]] = {h: {} for h in pending}
+            for (content_hash, unit_aspect), score in zip(units, scores):
+                if unit_aspect is None:
+                    review_scores[content_hash] = score
+                else:
+                    aspects[content_hash][unit_aspect] = _sentiment_label(score)
+
+            enriched = [
+                ReviewEnrichment(
+                    content_hash=content_hash,
+                    sentiment=_sentiment_label(review_scores[content_hash]),
+                    sentiment_score=round(review_scores[content_hash], 4),
+                    aspects=aspects[content_hash],
+                )
+                for content_hash in pending
+            ]
+            self._cache.put_many(enriched)
+            results.update({e.content_hash: e for e in enriched})
+
+            elapsed = time.perf_counter() - started
+            self._logger.info(
+                f"Scored {len(pending)} reviews ({len(texts)} texts) in {elapsed:.2f}s, "
+                f"{len(pending) / elapsed:.1f} reviews/s on CPU."
+            )
+
+        return [results[content_hash] for content_hash in hashes]
+
+
+def enrich_review_files(enricher: ReviewEnricher, timestamp: str, output_dir: str = "enriched") -> None:
+    """Enriches every review CSV file of the given timestamp into `output_dir`."""
+    logger = logging.getLogger(__name__)
+    for filepath in sorted(glob.glob(os.path.join("reviews", "*", f"{timestamp}_*.csv"))):
+        with open(filepath, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            continue
+
+        enrichments = enricher.enrich([row.get("content") or "" for row in rows])
+        for row, enrichment in zip(rows, enrichments):
+            row["sentiment"] = enrichment.sentiment
+            row["sentiment_score"] = enrichment.sentiment_score
+            row["aspects"] = json.dumps(enrichment.aspects)
+
+        source = os.path.basename(os.path.dirname(filepath))
+        target_dir = os.path.join(output_dir, source)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(filepath))
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"Wrote {len(rows)} enriched reviews to {target}.")
+
+
+@click.command()
+@click.option(
+    "--timestamp",
+    required=True,
+    type=str,
+    help="The timestamp prefix of the review files to enrich."
+)
+@click.option(
+    "--workers",
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    type=int,
+    help="Number of inference workers."
+)
+@click.option(
+    "--max-batch-tokens",
+    default=DEFAULT_MAX_BATCH_TOKENS,
+    show_default=True,
+    type=int,
+    help="Token budget of a single (padded) inference batch."
+)
+@click.option(
+    "--cache-path",
+    default=DEFAULT_CACHE_PATH,
+    show_default=True,
+    type=str,
+    help="Location of the on-disk enrichment cache."
+)
+def enrich_reviews(timestamp: str, workers: int, max_batch_tokens: int, cache_path: str) -> None:
+    enricher = ReviewEnricher(
+        cache=EnrichmentCache(cache_path),
+        workers=workers,
+        max_batch_tokens=max_batch_tokens,
+    )
+    enrich_review_files(enricher, timestamp)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    enrich_reviews()
@@ -0,0 +1,283 @@
+"""
+    Module for the on-disk HTTP response cache shared by the scrapers.
+
+    Responses are stored zlib-compressed in SQLite with a per-URL expiry. Stale
+    entries are revalidated with If-None-Match/If-Modified-Since when the server
+    sent validators, and the least recently used entries are evicted once the
+    cache grows past its size limit. In replay mode the network is never used.
+    Callers invalidate pages they cannot parse, e.g. bot walls served with status
+    200, so those are fetched again instead of being replayed.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from typing import TYPE_CHECKING, Callable
+
+import click
+
+from amazon_review_scraper.conf import amazon_review_scraper_settings
+from amazon_review_scraper.exception import BaseException
+from amazon_review_scraper.models import HTTPCacheStats
+
+
+if TYPE_CHECKING:
+    import requests
+
+CACHE_MODES = ("default", "replay", "off")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    encoding TEXT,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _to_stats(counters: dict) -> HTTPCacheStats:
+    served = counters["hits"] + counters["revalidated"]
+    total = served + counters["misses"]
+    return HTTPCacheStats(hit_ratio=round(served / total, 4) if total else 0.0, **counters)
+
+
+class CacheMissError(BaseException):
+    message = "URL is not in the HTTP cache and the cache is in replay mode."
+
+
+class HTTPResponseCache:
+    """Size-bounded LRU cache of HTTP GET responses"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        default_ttl: float,
+        mode: str = "default",
+        logger: logging.Logger | None = None,
+    ) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown HTTP cache mode {mode!r}, expected one of {CACHE_MODES}.")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._max_bytes = max_bytes
+        self._default_ttl = default_ttl
+        self._mode = mode
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0}
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Returns the SQLite connection of the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _record(self, name: str, bytes_saved: int = 0) -> None:
+        with self._lock:
+            self._stats[name] += 1
+            self._stats["bytes_saved"] += bytes_saved
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [(name, 1), ("bytes_saved", bytes_saved)],
+            )
+
+    @staticmethod
+    def _to_response(url: str, row: tuple) -> "requests.Response":
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        body, encoding, content_type = row
+        response = requests.Response()
+        response._content = zlib.decompress(body)
+        response.status_code = 200
+        response.url = url
+        response.encoding = encoding
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type or ""})
+        return response
+
+    def _store(self, url: str, response: "requests.Response", ttl: float) -> None:
+        now = time.time()
+        body = zlib.compress(response.content, 6)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (url, body, size, stored_size, encoding, content_type, etag, last_modified,"
+                " fetched_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    body,
+                    len(response.content),
+                    len(body),
+                    response.encoding,
+                    response.headers.get("Content-Type"),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now + ttl,
+                    now,
+                ),
+            )
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the stored bodies fit into max_bytes."""
+        with self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM responses").fetchone()[0]
+            if total <= self._max_bytes:
+                return
+            evicted = 0
+            for url, stored_size in self._conn.execute(
+                "SELECT url, stored_size FROM responses ORDER BY last_access"
+            ).fetchall():
+                if total <= self._max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                total -= stored_size
+                evicted += 1
+        self._logger.info(f"Evicted {evicted} responses from the HTTP cache.")
+
+    def get(
+        self,
+        url: str,
+        headers: dict | None = None,
+        cookies: dict | None = None,
+        ttl: float | None = None,
+        fetch: Callable | None = None,
+    ) -> "requests.Response":
+        """
+        Returns the response for a GET request to the URL, from the cache when possible.
+
+        Args:
+            url (str): The URL to fetch.
+            headers (dict | None): Request headers.
+            cookies (dict | None): Request cookies.
+            ttl (float | None): Seconds a fresh response stays valid, defaults to the cache-wide TTL.
+            fetch (Callable | None): Function performing the request, defaults to requests.get.
+        Raises:
+            CacheMissError: If the URL is not cached and the cache is in replay mode.
+        """
+        if fetch is None:
+            import requests
+
+            fetch = requests.get
+        if self._mode == "off":
+            return fetch(url, headers=headers, cookies=cookies)
+
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT body, encoding, content_type, size, etag, last_modified, expires_at FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is not None and (self._mode == "replay" or row[6] > now):
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            self._record("hits", row[3])
+            return self._to_response(url, row[:3])
+        if self._mode == "replay":
+            raise CacheMissError(f"{url} is not in the HTTP cache (replay mode).")
+
+        request_headers = dict(headers or {})
+        if row is not None:
+            if row[4]:
+                request_headers["If-None-Match"] = row[4]
+            if row[5]:
+                request_headers["If-Modified-Since"] = row[5]
+
+        response = fetch(url, headers=request_headers, cookies=cookies)
+        ttl = self._default_ttl if ttl is None else ttl
+        if response.status_code == 304 and row is not None:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE responses SET expires_at = ?, last_access = ? WHERE url = ?",
+                    (now + ttl, now, url),
+                )
+            self._record("revalidated", row[3])
+            return self._to_response(url, row[:3])
+
+        self._record("misses")
+        if response.status_code == 200:
+            self._store(url, response, ttl)
+        return response
+
+    def invalidate(self, url: str) -> None:
+        """Removes the response of the URL, e.g. a bot wall that passed as a regular page."""
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+
+    def stats(self) -> HTTPCacheStats:
+        """Returns the hit ratio and bytes saved by this process."""
+        with self._lock:
+            return _to_stats(self._stats)
+
+    def lifetime_stats(self) -> HTTPCacheStats:
+        """Returns the hit ratio and bytes saved since the cache file was created."""
+        stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0}
+        stats.update(dict(self._conn.execute("SELECT name, value FROM stats").fetchall()))
+        return _to_stats(stats)
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM stats")
+
+
+_http_cache: HTTPResponseCache | None = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPResponseCache:
+    """Returns the process-wide HTTP cache configured from the scraper settings."""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPResponseCache(
+                amazon_review_scraper_settings.http_cache_path,
+                max_bytes=amazon_review_scraper_settings.http_cache_max_bytes,
+                default_ttl=amazon_review_scraper_settings.http_cache_ttl,
+                mode=amazon_review_scraper_settings.http_cache_mode,
+            )
+        return _http_cache
+
+
+@click.command()
+@click.option("--clear", is_flag=True, help="Remove every cached response and reset the statistics.")
+def http_cache_stats(clear: bool) -> None:
+    cache = get_http_cache()
+    if clear:
+        cache.clear()
+    stats = cache.lifetime_stats()
+    click.echo(
+        f"hits={stats.hits} revalidated={stats.revalidated} misses={stats.misses} "
+        f"hit_ratio={stats.hit_ratio:.2%} bytes_saved={stats.bytes_saved}"
+    )
+
+
+if __name__ == "__main__":
+    http_cache_stats()
@@ -0,0 +1,222 @@
+"""
+    Module for the scrape job queue shared by workers on multiple machines.
+
+    Jobs live in a SQLite database that can sit on a shared volume. A worker leases
+    a job for a visibility timeout, extends the lease with heartbeats while it runs,
+    and acks or nacks it at the end. Jobs whose lease runs out are handed to the
+    next worker, and jobs that keep failing are parked as dead after max_attempts.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+from typing import Dict, Iterable, List, Sequence
+
+from amazon_review_scraper.exception import BaseException
+from amazon_review_scraper.models import ScrapeJob
+
+
+DEFAULT_QUEUE_PATH = os.path.join("queue", "scrape_jobs.sqlite3")
+DEFAULT_VISIBILITY_TIMEOUT = 900.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    ident_code TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (source, ident_code, timestamp)
+);
+CREATE INDEX IF NOT EXISTS jobs_state_available ON jobs (state, available_at);
+"""
+
+
+class LeaseLostError(BaseException):
+    message = "The job lease expired or was taken over by another worker."
+
+
+class SQLiteJobQueue:
+    """Scrape job queue with lease semantics, backed by a SQLite file"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, logger: logging.Logger | None = None) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._logger = logger if logger else logging.getLogger(__name__)
+        # autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # WAL needs shared memory, which network filesystems do not provide
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, params: Sequence = (), many: bool = False) -> sqlite3.Cursor:
+        """Runs a single write statement in its own immediate transaction."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.executemany(sql, params) if many else self._conn.execute(sql, params)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return cursor
+
+    def enqueue(
+        self,
+        source: str,
+        ident_codes: Iterable[str],
+        timestamp: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        Adds a scrape job per product code. Jobs already in the queue for the same timestamp are kept as they are.
+
+        Returns:
+            The number of newly added jobs.
+        """
+        now = time.time()
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO jobs"
+            " (source, ident_code, timestamp, max_attempts, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(source, code, timestamp, max_attempts, now, now, now) for code in ident_codes],
+            many=True,
+        )
+        self._logger.info(f"Enqueued {cursor.rowcount} {source} jobs for timestamp {timestamp}.")
+        return cursor.rowcount
+
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        sources: Sequence[str] | None = None,
+    ) -> ScrapeJob | None:
+        """
+        Leases the next available job, including jobs whose previous lease expired.
+
+        Args:
+            worker_id (str): Name of the leasing worker, stored for troubleshooting.
+            visibility_timeout (float): Seconds until the job is handed out again without a heartbeat.
+            sources (Sequence[str] | None): Only lease jobs of these retailers.
+        Returns:
+            The leased job, or None if no job is available.
+        """
+        now = time.time()
+        conditions = "((state = 'queued' AND available_at <= ?) OR (state = 'leased' AND lease_expires_at <= ?))"
+        params: list = [now, now]
+        if sources:
+            conditions += f" AND source IN ({','.join('?' * len(sources))})"
+            params.extend(sources)
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id, source, ident_code, timestamp, attempts, max_attempts FROM jobs"
+                    f" WHERE {conditions} ORDER BY available_at LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                job_id, source, ident_code, timestamp, attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    # the last attempt died without acking, e.g. the worker machine went away
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'dead', lease_token = NULL, updated_at = ?,"
+                        " last_error = COALESCE(last_error, 'lease expired') WHERE id = ?",
+                        (now, job_id),
+                    )
+                    self._logger.error(f"Job {job_id} ({source} {ident_code}) is dead after {attempts} attempts.")
+                    continue
+
+                lease_token = uuid.uuid4().hex
+                self._conn.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?,"
+                    " lease_token = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (worker_id, lease_token, now + visibility_timeout, now, job_id),
+                )
+                self._conn.execute("COMMIT")
+                return ScrapeJob(
+                    id=job_id,
+                    source=source,
+                    ident_code=ident_code,
+                    timestamp=timestamp,
+                    attempts=attempts + 1,
+                    lease_token=lease_token,
+                )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, job: ScrapeJob, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> None:
+        """
+        Extends the lease of a running job.
+
+        Raises:
+            LeaseLostError: If the lease expired and the job was leased by another worker.
+        """
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND lease_token = ? AND state = 'leased'",
+            (now + visibility_timeout, now, job.id, job.lease_token),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError
+
+    def ack(self, job: ScrapeJob) -> None:
+        """Marks a leased job as done."""
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE jobs SET state = 'done', lease_token = NULL, updated_at = ? WHERE id = ? AND lease_token = ?",
+            (now, job.id, job.lease_token),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError
+
+    def nack(self, job: ScrapeJob, error: str, retry_delay: float = DEFAULT_RETRY_DELAY) -> None:
+        """Returns a failed job to the queue with exponential backoff, or marks it dead after its last attempt."""
+        now = time.time()
+        delay = retry_delay * 2 ** (job.attempts - 1)
+        cursor = self._execute(
+            "UPDATE jobs SET"
+            " state = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,"
+            " available_at = ?, lease_token = NULL, last_error = ?, updated_at = ?"
+            " WHERE id = ? AND lease_token = ?",
+            (now + delay, error, now, job.id, job.lease_token),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Returns the number of jobs per source and state."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for source, state, count in self._conn.execute(
+            "SELECT source, state, COUNT(*) FROM jobs GROUP BY source, state"
+        ):
+            counts.setdefault(source, {})[state] = count
+        return counts
+
+    def dead_jobs(self) -> List[tuple]:
+        """Returns (source, ident_code, timestamp, last_error) of every dead job."""
+        return self._conn.execute(
+            "SELECT source, ident_code, timestamp, last_error FROM jobs WHERE state = 'dead' ORDER BY id"
+        ).fetchall()
+
+    def close(self) -> None:
+        self._conn.close()
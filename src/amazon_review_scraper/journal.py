@@ -0,0 +1,129 @@
+"""
+    Module for the run journal of Amazon scrapes.
+
+    The journal records per ASIN how far a run got (product page scraped, review
+    pages scraped, CSV files written). Every ASIN has its own JSON file in a
+    directory per timestamp, so workers scraping different ASINs of the same run
+    never overwrite each other. Rerunning the same timestamp resumes from it
+    instead of scraping completed ASINs again.
+"""
+
+import logging
+import os
+import threading
+
+from typing import Dict, List
+
+from amazon_review_scraper.models import AsinProgress, Product, Review
+
+
+DEFAULT_JOURNAL_DIR = os.path.join("journals", "amazon")
+
+STATUS_PENDING = "pending"
+STATUS_SCRAPED = "scraped"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class RunJournal:
+    """Per-ASIN progress of an Amazon scrape run"""
+
+    def __init__(self, directory: str | None = None, logger: logging.Logger | None = None) -> None:
+        """
+        Args:
+            directory (str | None): Directory of the ASIN files of the run, None keeps the journal in memory.
+        """
+        self._directory = directory
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._entries: Dict[str, AsinProgress] = {}
+
+    @classmethod
+    def for_timestamp(
+        cls, timestamp: str, directory: str = DEFAULT_JOURNAL_DIR, logger: logging.Logger | None = None
+    ) -> "RunJournal":
+        """Returns the journal stored for the given run timestamp, or a new one."""
+        return cls(os.path.join(directory, timestamp), logger)
+
+    def _path(self, asin_code: str) -> str | None:
+        return os.path.join(self._directory, f"{asin_code}.json") if self._directory else None
+
+    def _load(self, asin_code: str) -> AsinProgress:
+        path = self._path(asin_code)
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                entry = AsinProgress.model_validate_json(f.read())
+            if entry.status != STATUS_PENDING:
+                self._logger.info(f"Resuming {asin_code} from journal {path} ({entry.status}).")
+            return entry
+        return AsinProgress()
+
+    def _save(self, asin_code: str) -> None:
+        """Writes the ASIN file atomically, so a crash never leaves a truncated file behind."""
+        path = self._path(asin_code)
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # unique per writer, so concurrent writers never replace each other's temp file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self._entries[asin_code].model_dump_json(indent=2))
+        os.replace(temp_path, path)
+
+    def _entry(self, asin_code: str) -> AsinProgress:
+        if asin_code not in self._entries:
+            self._entries[asin_code] = self._load(asin_code)
+        return self._entries[asin_code]
+
+    def status(self, asin_code: str) -> str:
+        return self._entry(asin_code).status
+
+    def pending(self, asin_codes: List[str]) -> List[str]:
+        """Returns the ASIN codes whose results are not written yet, as stored right now."""
+        for asin_code in asin_codes:
+            self._entries[asin_code] = self._load(asin_code)
+        return [asin_code for asin_code in asin_codes if self.status(asin_code) != STATUS_DONE]
+
+    def product(self, asin_code: str) -> Product | None:
+        return self._entry(asin_code).product
+
+    def reviews(self, asin_code: str) -> List[Review]:
+        return [review for page in self._entry(asin_code).review_pages for review in page]
+
+    def review_pages_done(self, asin_code: str) -> int:
+        return len(self._entry(asin_code).review_pages)
+
+    def reviews_complete(self, asin_code: str) -> bool:
+        return self._entry(asin_code).reviews_complete
+
+    def record_attempt(self, asin_code: str) -> int:
+        """Counts a new scrape attempt of the ASIN and returns the total number of attempts."""
+        entry = self._entry(asin_code)
+        entry.attempts += 1
+        entry.error = None
+        self._save(asin_code)
+        return entry.attempts
+
+    def record_product(self, asin_code: str, product: Product) -> None:
+        self._entry(asin_code).product = product
+        self._save(asin_code)
+
+    def record_review_page(self, asin_code: str, reviews: List[Review]) -> None:
+        self._entry(asin_code).review_pages.append(reviews)
+        self._save(asin_code)
+
+    def mark_reviews_complete(self, asin_code: str) -> None:
+        entry = self._entry(asin_code)
+        entry.reviews_complete = True
+        entry.status = STATUS_SCRAPED
+        self._save(asin_code)
+
+    def mark_done(self, asin_code: str) -> None:
+        """Marks an ASIN whose product and review files are written."""
+        self._entry(asin_code).status = STATUS_DONE
+        self._save(asin_code)
+
+    def mark_failed(self, asin_code: str, error: str) -> None:
+        entry = self._entry(asin_code)
+        entry.status = STATUS_FAILED
+        entry.error = error
+        self._save(asin_code)
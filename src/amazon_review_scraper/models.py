@@ -8,9 +8,12 @@ from pydantic import BaseModel
 class Product(BaseModel):
     ident_code: str
     name: str
-    base_price: float
-    final_price: float
+    # empty in the price matrix if a region shows no list price or no offer
+    base_price: float | None = None
+    final_price: float | None = None
     inventory_status: str
+    # zip code the price and availability were shown for
+    region: str | None = None
 
 
 class Review(BaseModel):
@@ -21,3 +24,59 @@ class Review(BaseModel):
     review_date: str
     verified_purchase: bool
     helpful_text: str
+    cluster_id: str | None = None
+
+
+class ReviewEnrichment(BaseModel):
+    content_hash: str
+    sentiment: str
+    sentiment_score: float
+    aspects: dict[str, str]
+
+
+class ReviewSearchResult(BaseModel):
+    source: str
+    ident_code: str
+    review_date: str | None
+    rating: float | None
+    author: str
+    title: str
+    cluster_id: str | None
+    snippet: str
+    score: float
+
+
+class ScrapeJob(BaseModel):
+    id: int
+    source: str
+    ident_code: str
+    timestamp: str
+    attempts: int
+    lease_token: str
+
+
+class HTTPCacheStats(BaseModel):
+    hits: int
+    revalidated: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+
+
+class ThrottleMetrics(BaseModel):
+    retailer: str
+    concurrency_limit: int
+    in_flight: int
+    request_delay: float
+    block_rate: float
+    cooldown_remaining: float
+    requests: int
+
+
+class AsinProgress(BaseModel):
+    status: str = "pending"
+    attempts: int = 0
+    product: Product | None = None
+    review_pages: list[list[Review]] = []
+    reviews_complete: bool = False
+    error: str | None = None
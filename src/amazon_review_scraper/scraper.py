@@ -3,17 +3,19 @@
 """
 
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import os
 import json
 import requests
-from transformers import VisionEncoderDecoderModel, TrOCRProcessor
-from PIL import Image
 from io import BytesIO
 from dotenv import load_dotenv
-from typing import List, Generator
+from typing import Callable, List, Generator, Tuple
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -23,12 +25,34 @@ from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 
+from amazon_review_scraper.browser import (
+    BrowserClosedError,
+    ManagedChromeDriver,
+    install_exit_handlers,
+    owner_pid_argument,
+    reap_orphaned_browsers,
+)
 from amazon_review_scraper.conf import amazon_review_scraper_settings
+from amazon_review_scraper.exception import BaseException
+from amazon_review_scraper.journal import RunJournal
 from amazon_review_scraper.models import Product, Review
+from amazon_review_scraper.throttle import ResponseBlockedError, ResponseClass, classify_response, get_controller
 
 load_dotenv()
 logging.getLogger("WDM").setLevel(logging.ERROR)
 
+# only the first review pages are scraped per product
+MAX_REVIEW_PAGES = 2
+# shown instead of reviews on the review page of a product without reviews
+NO_REVIEWS_SELECTOR = ".no-reviews-section"
+
+# New York, the region of the review scrape
+DEFAULT_ZIP_CODE = "10001"
+# browsers running at once in the multi-region price matrix
+MAX_REGION_WORKERS = 4
+# seconds the price matrix waits for the title of a loaded product page, prices are not waited for
+REGION_PAGE_TIMEOUT = 15
+
 
 class DriverInitializationError(BaseException):
     message = "Unable to initialize Chrome webdriver for scraping."
@@ -38,13 +62,42 @@ class DriverGetReviewsError(BaseException):
     message = "Unable to get Amazon review data with Chrome webdriver."
 
 
+class ProductInfoError(BaseException):
+    message = "Unable to parse the Amazon product page."
+
+
+def _parse_price(text: str | None) -> float | None:
+    """Converts a price text like "$1,299.99" into a number, None if it is no price."""
+    try:
+        return float((text or "").replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
 class AmazonReviewScraper:
     """Class for scraping Amazon reviews"""
 
     def __init__(self, logger: logging.Logger | None = None) -> None:
         self._logger = logger if logger else logging.getLogger(__name__)
-        # 初始化 Hugging Face 的 Captcha OCR 模型與 processor
+        # Captcha OCR 模型只在第一次遇到 Captcha 時才載入 (transformers/torch 載入很慢)
+        self._ocr_processor = None
+        self._ocr_model = None
+        self._ocr_load_attempted = False
+        # the price matrix solves captchas from several browsers at once
+        self._ocr_lock = threading.Lock()
+
+    def _load_ocr_model(self) -> None:
+        """初始化 Hugging Face 的 Captcha OCR 模型與 processor，只會嘗試一次"""
+        with self._ocr_lock:
+            if self._ocr_load_attempted:
+                return
+            self._ocr_load_attempted = True
+            self._load_ocr_model_once()
+
+    def _load_ocr_model_once(self) -> None:
         try:
+            from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
             self._ocr_processor = TrOCRProcessor.from_pretrained("anuashok/ocr-captcha-v3", use_fast=True)
             self._ocr_model = VisionEncoderDecoderModel.from_pretrained("anuashok/ocr-captcha-v3")
             self._logger.info("OCR Captcha 模型載入成功")
@@ -64,6 +117,7 @@ class AmazonReviewScraper:
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument(owner_pid_argument()) # 讓之後的執行能辨識並清除殘留的 Chrome
         driver_path = ChromeDriverManager().install()
         if "THIRD_PARTY_NOTICES.chromedriver" in driver_path:
             driver_path = driver_path.replace("THIRD_PARTY_NOTICES.chromedriver", "chromedriver")
@@ -114,6 +168,8 @@ class AmazonReviewScraper:
                     # 下載 Captcha 圖片
                     response = requests.get(captcha_url, stream=True)
                     if response.status_code == 200:
+                        from PIL import Image
+
                         image_bytes = BytesIO(response.content)
                         captcha_image = Image.open(image_bytes)
                         
@@ -121,6 +177,7 @@ class AmazonReviewScraper:
                         captcha_image = captcha_image.convert("RGB")
                         
                         # 使用 Hugging Face OCR 模型進行 Captcha 辨識
+                        self._load_ocr_model()
                         if self._ocr_processor and self._ocr_model:
                             pixel_values = self._ocr_processor(captcha_image, return_tensors="pt").pixel_values
                             generated_ids = self._ocr_model.generate(pixel_values, num_beams=2, length_penalty=1.3612823161368288)
@@ -169,9 +226,11 @@ class AmazonReviewScraper:
         sign_out = WebDriverWait(driver, 60).until(EC.element_to_be_clickable((By.ID, "nav-item-signout")))
         sign_out.click()
 
-    def _get_product_info(self, driver: webdriver.Chrome, asin_code: str) -> Product:
+    def _get_product_info(self, driver: webdriver.Chrome, asin_code: str, region: str = DEFAULT_ZIP_CODE) -> Product:
         """
         從 Amazon 商品頁面爬取所需資料
+        Raises:
+            ProductInfoError: If the product page is missing any of the fields.
         """
         self._logger.info(f"開始爬取 {asin_code} 產品頁資料...")
         try:
@@ -188,60 +247,104 @@ class AmazonReviewScraper:
             self._logger.info(final_price)
             self._logger.info(product_inventory_status)
         except Exception as e:
-            self._logger.exception(f"爬取 {asin_code} 產品頁資料時發生錯誤: {e}")
+            raise ProductInfoError(f"爬取 {asin_code} 產品頁資料時發生錯誤: {e}") from e
 
         return Product(
             ident_code=asin_code,
             name=product_name,
             base_price=base_price,
             final_price=final_price,
-            inventory_status=product_inventory_status
+            inventory_status=product_inventory_status,
+            region=region
         )
         
-    def _get_all_reviews(self, driver: webdriver.Chrome) -> List[Review]:
+    def _get_region_product_info(self, driver: webdriver.Chrome, asin_code: str, region: str) -> Product:
         """
-        從 Amazon 商品評論頁面爬取所有留言（分頁），直到沒有下一頁。
+        從已載入的 Amazon 商品頁面爬取價格矩陣所需資料
+        Prices are read without waiting, a product without a list price or without an offer
+        in the region (out of stock, not shipped there) keeps empty prices and its availability.
+        Raises:
+            ProductInfoError: If the page shows no product title.
         """
-        
-        all_reviews = []
-        page = 1
+        try:
+            product_name = WebDriverWait(driver, REGION_PAGE_TIMEOUT).until(
+                EC.presence_of_element_located((By.ID, "productTitle"))
+            ).text
+        except TimeoutException as e:
+            raise ProductInfoError(f"{asin_code} 在地區 {region} 沒有產品頁") from e
+
+        base_price = None
+        base_price_blocks = driver.find_elements(By.CSS_SELECTOR, ".basisPrice .a-offscreen")
+        if base_price_blocks:
+            base_price = _parse_price(base_price_blocks[0].get_attribute("innerHTML"))
+        final_price = None
+        price_int = driver.find_elements(By.CSS_SELECTOR, ".priceToPay span.a-price-whole")
+        price_decimal = driver.find_elements(By.CSS_SELECTOR, ".priceToPay span.a-price-fraction")
+        if price_int and price_decimal:
+            final_price = _parse_price(price_int[0].text.rstrip(".") + "." + price_decimal[0].text)
+        availability = driver.find_elements(By.ID, "availability")
+        inventory_status = availability[0].text.strip() if availability else ""
 
-        while page <= 2: # only get the first 2 pages
+        return Product(
+            ident_code=asin_code,
+            name=product_name,
+            base_price=base_price,
+            final_price=final_price,
+            inventory_status=inventory_status or "unknown",
+            region=region
+        )
+
+    def _get_all_reviews(self, browser: ManagedChromeDriver, asin_code: str, journal: RunJournal) -> List[Review]:
+        """
+        從 Amazon 商品評論頁面爬取留言（分頁），直到沒有下一頁或達到 MAX_REVIEW_PAGES。
+        每爬完一頁就寫入 journal，重跑時從下一頁繼續。
+        Raises:
+            DriverGetReviewsError: If a review page does not load, the pages before it stay in the journal.
+        """
+        page = journal.review_pages_done(asin_code) + 1
+
+        while page <= MAX_REVIEW_PAGES:
             self._logger.info(f"開始爬取第 {page} 頁評論")
+            review_url = amazon_review_scraper_settings.get_amazon_product_reviews_url(asin_code, page)
+            driver = browser.checkpoint()
+            self._load_page(driver, review_url)
+            time.sleep(1)
 
-            # 抓取當前頁面的所有 review 區塊
+            # 抓取當前頁面的所有 review 區塊，沒有評論的商品會顯示 no-reviews 區塊
             try:
-                review_elements = WebDriverWait(driver, 60).until(EC.presence_of_all_elements_located((By.CLASS_NAME, "review")))
+                WebDriverWait(driver, 60).until(EC.any_of(
+                    EC.presence_of_element_located((By.CLASS_NAME, "review")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, NO_REVIEWS_SELECTOR)),
+                ))
             except Exception as e:
-                self._logger.exception("爬取評論區塊失敗，結束分頁爬取")
-                break
+                # 失敗的頁面不寫入 journal，重試時從這一頁繼續
+                raise DriverGetReviewsError(f"{asin_code} 第 {page} 頁評論載入失敗") from e
+            review_elements = driver.find_elements(By.CLASS_NAME, "review")
 
             self._logger.info(f"第 {page} 頁找到 {len(review_elements)} 筆評論")
+            page_reviews = []
             for review in review_elements:
                 try:
                     parsed_review = self._parse_review_data(driver, review)
-                    all_reviews.append(parsed_review)
+                    page_reviews.append(parsed_review)
                 except Exception:
                     self._logger.exception(f"解析第 {page} 頁評論時發生錯誤")
                     continue
+            journal.record_review_page(asin_code, page_reviews)
 
             # 檢查下一頁按鈕是否可點擊（或是否處於 disabled 狀態）
             try:
-                next_button = driver.find_element(By.CSS_SELECTOR, ".a-last a")
-                next_button_class = next_button.get_attribute("class")
-                if "a-disabled" in next_button_class:
+                next_button = driver.find_element(By.CSS_SELECTOR, ".a-last")
+                if "a-disabled" in next_button.get_attribute("class"):
                     self._logger.info("下一頁按鈕被 disable，已到達最後一頁")
                     break
-                else:
-                    self._logger.info("點擊下一頁按鈕，切換到下一頁")
-                    next_button.click()
-                    time.sleep(2)  # 等待下一頁載入
-                    page += 1
-            except Exception as e:
+                page += 1
+            except Exception:
                 self._logger.info("找不到下一頁按鈕，結束分頁爬取")
                 break
 
-        return all_reviews
+        journal.mark_reviews_complete(asin_code)
+        return journal.reviews(asin_code)
 
     def _parse_review_data(self, driver: webdriver.Chrome, review: WebElement) -> Review:
         """Parses review data from the given review element"""
@@ -281,66 +384,212 @@ class AmazonReviewScraper:
             helpful_text=helpful_text
         )
     
-    def _change_locale_to_new_york(self, driver: webdriver.Chrome) -> None:
+    def _change_locale(self, driver: webdriver.Chrome, zip_code: str = DEFAULT_ZIP_CODE) -> None:
         """
-        Changes the locale to New York
+        Changes the delivery location to the given zip code, New York by default
         Because Amazon shows different reviews and price based on the location
+        The location is kept in the session cookies, so it is set once per browser
         """
         location_popover = WebDriverWait(driver, 60).until(EC.element_to_be_clickable((By.ID, 'nav-global-location-popover-link')))
         location_popover.click()
         GLUXZipUpdateInput = WebDriverWait(driver, 60).until(EC.element_to_be_clickable((By.ID, 'GLUXZipUpdateInput')))
-        GLUXZipUpdateInput.send_keys("10001") # New York zip code
+        GLUXZipUpdateInput.send_keys(zip_code)
         GLUXZipUpdate = WebDriverWait(driver, 60).until(EC.element_to_be_clickable((By.ID, "GLUXZipUpdate")))
         GLUXZipUpdate.click()
         done_button = WebDriverWait(driver, 60).until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[name="glowDoneButton"]')))
         done_button.click()
         driver.refresh()
 
+    def _load_page(self, driver: webdriver.Chrome, url: str) -> None:
+        """
+        Opens a page under the Amazon request controller.
+        Captcha and robot check pages slow down further requests, captchas are solved right away.
+        Raises:
+            ResponseBlockedError: If the page is a robot check or a captcha that could not be solved.
+        """
+        controller = get_controller("amazon")
+        controller.acquire()
+        # a page that fails to load counts as throttling
+        result = ResponseClass.THROTTLED
+        try:
+            driver.get(url)
+            result = classify_response("amazon", 200, driver.page_source)
+        finally:
+            controller.release(result)
+        if result == ResponseClass.CAPTCHA:
+            self._handle_captcha(driver)
+            result = classify_response("amazon", 200, driver.page_source)
+        if result != ResponseClass.OK:
+            raise ResponseBlockedError(f"Amazon 回應 {result.value}: {url}")
+
     def _get_product_from_product_page(self, driver: webdriver.Chrome, url: str, asin_code: str) -> Product:
         """Scrapes Amazon product page for product information"""
-        driver.get(url)
+        self._load_page(driver, url)
         time.sleep(1)
         product = self._get_product_info(driver, asin_code)
         return product
 
-    def _get_reviews_from_product_review_page(self, driver: webdriver.Chrome, review_url: str) -> List[Review]:
-        """Scrapes Amazon product review page for reviews"""
-        driver.get(review_url) # open the product reviews page and get the reviews
+    def _scrape_asin(self, browser: ManagedChromeDriver, asin_code: str, journal: RunJournal) -> Tuple[Product, List[Review]]:
+        """Scrapes the product page and the review pages of an ASIN, skipping the steps the journal already holds"""
+        product = journal.product(asin_code)
+        if product is None:
+            url = amazon_review_scraper_settings.get_amazon_product_url(asin_code)
+            product = self._get_product_from_product_page(browser.checkpoint(), url, asin_code)
+            journal.record_product(asin_code, product)
+        if journal.reviews_complete(asin_code):
+            return product, journal.reviews(asin_code)
+        return product, self._get_all_reviews(browser, asin_code, journal)
+
+    def _scrape_asin_with_retries(
+        self, browser: ManagedChromeDriver, asin_code: str, journal: RunJournal, max_attempts: int
+    ) -> Tuple[Product, List[Review]] | None:
+        """
+        Scrapes an ASIN up to max_attempts times, returns None and marks it as failed if every attempt fails.
+        Every retry runs in a new browser, in case the old one crashed or hangs. If the new
+        browser cannot be started, the next attempt starts one again.
+        """
+        error = f"No scrape attempt, max_attempts is {max_attempts}"
+        for attempt in range(1, max_attempts + 1):
+            try:
+                journal.record_attempt(asin_code)
+                return self._scrape_asin(browser, asin_code, journal)
+            except BrowserClosedError:
+                # quit by a signal handler, the run is shutting down
+                raise
+            except Exception as e:
+                self._logger.exception(f"爬取 {asin_code} 第 {attempt}/{max_attempts} 次失敗")
+                error = f"{type(e).__name__}: {e}"
+            if attempt < max_attempts:
+                try:
+                    browser.recycle()
+                except BrowserClosedError:
+                    raise
+                except Exception:
+                    self._logger.exception(f"重啟 Chrome 失敗，{asin_code} 的下一次嘗試會再啟動瀏覽器")
+        journal.mark_failed(asin_code, error)
+        return None
+
+    def _new_browser(self, setup: Callable[[webdriver.Chrome], None]) -> ManagedChromeDriver:
+        """Returns a managed Chrome webdriver with the configured recycling limits"""
+        return ManagedChromeDriver(
+            self._init_chrome_driver,
+            setup=setup,
+            max_pages=amazon_review_scraper_settings.chrome_max_pages,
+            max_rss_bytes=amazon_review_scraper_settings.chrome_max_rss_mb * 2 ** 20,
+            logger=self._logger,
+        )
+
+    def _start_session(self, driver: webdriver.Chrome) -> None:
+        """Logs in and sets the New York locale in a new browser"""
+        self._login_to_amazon(driver)
+        time.sleep(1)
+        self._change_locale(driver)
         time.sleep(1)
-        reviews = self._get_all_reviews(driver)
-        return reviews
 
-    def scrape_amazon_products_and_reviews(self, asin_codes: List[str]) -> Generator[List[Review], None, None]:
+    def _close_browser(self, browser: ManagedChromeDriver) -> None:
+        """Logs out and quits the browser, quit() also ends the chromedriver process"""
+        try:
+            if browser.is_running:
+                self._logout_from_amazon(browser.driver)
+        except Exception:
+            self._logger.exception("登出 Amazon 時發生錯誤")
+        finally:
+            browser.quit()
+            self._logger.info(
+                f"Chrome 共重啟 {browser.recycles} 次，最高記憶體用量 {browser.peak_rss / 2 ** 20:.0f} MB"
+            )
+
+    def scrape_amazon_products_and_reviews(
+        self, asin_codes: List[str], journal: RunJournal | None = None, max_attempts: int = 3
+    ) -> Generator[Tuple[str, Product, List[Review]], None, None]:
         """
         Retrieves reviews from Amazon for each given Amazon product ASIN code.
+
+        Progress is recorded in the journal after every product and review page, ASINs it marks
+        as done are skipped. An ASIN that keeps failing is marked as failed after max_attempts
+        and the remaining ASINs are still scraped. The browser is always closed, even if the
+        caller stops consuming the generator.
         Yields:
-            A list of Review objects for each ASIN code.
+            The ASIN code, its Product and a list of Review objects for each scraped ASIN code.
         Raises:
             DriverInitializationError: If the Chrome webdriver cannot be initialized.
-            DriverGetReviewsError: If scraping reviews fails.
         """
-        self._logger.info(f"Scraping Amazon Reviews for product {asin_codes}..")
-
+        journal = journal if journal else RunJournal()
+        pending_codes = journal.pending(asin_codes)
+        if not pending_codes:
+            self._logger.info(f"All Amazon products {asin_codes} are already scraped.")
+            return
+        self._logger.info(f"Scraping Amazon Reviews for product {pending_codes}..")
+
+        reap_orphaned_browsers(self._logger)
+        browser = self._new_browser(self._start_session)
         try:
-            driver = self._init_chrome_driver()
-        except Exception as e:
-            raise DriverInitializationError from e
-
-        self._login_to_amazon(driver)
-        time.sleep(1)
-        self._change_locale_to_new_york(driver)
+            try:
+                browser.start()
+            except Exception as e:
+                raise DriverInitializationError from e
+
+            for asin_code in pending_codes:
+                result = self._scrape_asin_with_retries(browser, asin_code, journal, max_attempts)
+                if result:
+                    yield asin_code, *result
+        finally:
+            # logout and close the browser
+            self._close_browser(browser)
+
+    def _localize(self, driver: webdriver.Chrome, zip_code: str) -> None:
+        """Sets the location of a new browser, product pages need no login"""
+        # the location popover is on every page
+        self._load_page(driver, "https://www.amazon.com")
+        self._change_locale(driver, zip_code)
         time.sleep(1)
 
-        for asin_code in asin_codes:
-            url = amazon_review_scraper_settings.get_amazon_product_url(asin_code)
-            review_url = amazon_review_scraper_settings.get_amazon_product_reviews_url(asin_code)
+    def _scrape_region_prices(self, asin_codes: List[str], zip_code: str) -> List[Product]:
+        """Scrapes the product pages of all ASIN codes in one browser localized to the zip code"""
+        self._logger.info(f"開始爬取地區 {zip_code} 的 {len(asin_codes)} 個產品頁")
+        browser = self._new_browser(partial(self._localize, zip_code=zip_code))
+        products = []
+        try:
             try:
-                product = self._get_product_from_product_page(driver, url, asin_code)
-                reviews_batch = self._get_reviews_from_product_review_page(driver, review_url)
-                yield asin_code, product, reviews_batch
+                browser.start()
             except Exception as e:
-                raise DriverGetReviewsError from e
-        
-        # logout and close the browser
-        self._logout_from_amazon(driver)
-        driver.close()
+                raise DriverInitializationError from e
+
+            for asin_code in asin_codes:
+                url = amazon_review_scraper_settings.get_amazon_product_url(asin_code)
+                try:
+                    driver = browser.checkpoint()
+                    self._load_page(driver, url)
+                    products.append(self._get_region_product_info(driver, asin_code, zip_code))
+                except BrowserClosedError:
+                    raise
+                except Exception:
+                    self._logger.exception(f"爬取 {asin_code} 在地區 {zip_code} 的產品頁失敗")
+        finally:
+            browser.quit()
+        return products
+
+    def scrape_amazon_price_matrix(self, asin_codes: List[str], zip_codes: List[str]) -> List[Product]:
+        """
+        Retrieves the price and availability of each Amazon product in each region.
+
+        Every region gets its own browser that is localized once, the regions are scraped concurrently.
+        Returns:
+            A Product per scraped (ASIN code, zip code) pair, with the zip code as region.
+            Pairs whose product page failed are left out.
+        """
+        self._logger.info(f"Scraping Amazon prices for products {asin_codes} in regions {zip_codes}..")
+        reap_orphaned_browsers(self._logger)
+        # the browsers start in worker threads, signal handlers must be installed from here
+        install_exit_handlers()
+        products = []
+        with ThreadPoolExecutor(max_workers=min(len(zip_codes), MAX_REGION_WORKERS)) as executor:
+            futures = {
+                zip_code: executor.submit(self._scrape_region_prices, asin_codes, zip_code) for zip_code in zip_codes
+            }
+            for zip_code, future in futures.items():
+                try:
+                    products.extend(future.result())
+                except Exception:
+                    self._logger.exception(f"地區 {zip_code} 的瀏覽器無法啟動或設定地區失敗")
+        return products
@@ -0,0 +1,350 @@
+"""
+    Module for the local full-text search index over scraped reviews.
+
+    Reviews of every retailer are stored in a single SQLite database with an FTS5
+    index over their title and content. Scrapers add reviews as they write their
+    CSV files; re-adding an already indexed review is a no-op.
+"""
+
+import csv
+import glob
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, List, Sequence, Tuple
+
+import click
+
+from amazon_review_scraper.models import ReviewSearchResult
+
+
+DEFAULT_INDEX_PATH = os.path.join("reviews", "review_index.sqlite3")
+
+_REVIEW_FILE_PATTERN = re.compile(r"^(?P<timestamp>\d+)_(?P<source>[a-z]+)_reviews_(?P<ident_code>.+)\.csv$")
+_MONTH_DATE_PATTERN = re.compile(r"([A-Z][a-z]+)\.? (\d{1,2}), (\d{4})")
+_SLASH_DATE_PATTERN = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+_ISO_DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_RELATIVE_DATE_PATTERN = re.compile(r"(\d+|a|an) (day|week|month|year)s? ago")
+_RELATIVE_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    review_key TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    ident_code TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    review_date TEXT,
+    rating REAL,
+    author TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    cluster_id TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_source_ident_date ON reviews (source, ident_code, review_date);
+CREATE INDEX IF NOT EXISTS reviews_date ON reviews (review_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5 (
+    title, content, content='reviews', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS reviews_ai AFTER INSERT ON reviews BEGIN
+    INSERT INTO reviews_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS reviews_ad AFTER DELETE ON reviews BEGIN
+    INSERT INTO reviews_fts (reviews_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+"""
+
+
+def normalize_review_date(review_date: str | None, timestamp: str) -> str | None:
+    """
+    Converts the review date text of any retailer into an ISO date (YYYY-MM-DD).
+
+    Args:
+        review_date (str | None): Raw date, e.g. "Reviewed in the United States on March 3, 2025",
+            "3/12/2025" or "2 months ago".
+        timestamp (str): The scrape timestamp (YYYYMMDDHHMM), used for relative dates.
+    """
+    if not review_date:
+        return None
+    if match := _ISO_DATE_PATTERN.search(review_date):
+        return "-".join(match.groups())
+    if match := _SLASH_DATE_PATTERN.search(review_date):
+        month, day, year = (int(part) for part in match.groups())
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return None
+    if match := _MONTH_DATE_PATTERN.search(review_date):
+        month_name, day_text, year_text = match.groups()
+        for fmt in ("%B %d %Y", "%b %d %Y"):
+            try:
+                return datetime.strptime(f"{month_name} {day_text} {year_text}", fmt).date().isoformat()
+            except ValueError:
+                continue
+    if match := _RELATIVE_DATE_PATTERN.search(review_date.lower()):
+        amount, unit = match.groups()
+        count = 1 if amount in ("a", "an") else int(amount)
+        scraped_on = datetime.strptime(timestamp[:8], "%Y%m%d").date()
+        return (scraped_on - timedelta(days=count * _RELATIVE_DAYS[unit])).isoformat()
+    return None
+
+
+def quote_query(query: str) -> str:
+    """
+    Quotes every term of a plain query as an FTS5 phrase, so "battery-life" searches
+    the phrase "battery life" instead of failing as a column filter.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def review_key(source: str, ident_code: str, review: dict) -> str:
+    """
+    Returns a stable identifier of a scraped review.
+    Relative dates ("2 months ago") change between scrapes and are left out of the key.
+    """
+    review_date = str(review.get("review_date") or "")
+    if _RELATIVE_DATE_PATTERN.search(review_date.lower()):
+        review_date = ""
+    fields = (
+        source,
+        ident_code,
+        str(review.get("author") or ""),
+        review_date,
+        str(review.get("title") or ""),
+        str(review.get("content") or ""),
+    )
+    return hashlib.sha1("\0".join(fields).encode("utf-8")).hexdigest()
+
+
+def _parse_rating(rating: Any) -> float | None:
+    try:
+        return float(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+class ReviewSearchIndex:
+    """Incrementally maintained full-text index of scraped reviews"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, logger: logging.Logger | None = None) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._logger = logger if logger else logging.getLogger(__name__)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reviews)")}
+        if "cluster_id" not in columns:
+            # indexes created before near-duplicate clustering existed
+            self._conn.execute("ALTER TABLE reviews ADD COLUMN cluster_id TEXT")
+        self._conn.commit()
+
+    def add_reviews(self, source: str, ident_code: str, timestamp: str, reviews: Iterable[dict]) -> int:
+        """
+        Adds the reviews of one product to the index.
+
+        Args:
+            source (str): Retailer the reviews were scraped from, e.g. "amazon".
+            ident_code (str): The product code (ASIN, Walmart or Best Buy id).
+            timestamp (str): The scrape timestamp (YYYYMMDDHHMM).
+            reviews (Iterable[dict]): Reviews with the fields of the Review model.
+        Returns:
+            The number of reviews that were not indexed before.
+        """
+        rows = []
+        for review in reviews:
+            rows.append((
+                review_key(source, ident_code, review),
+                source,
+                ident_code,
+                timestamp,
+                normalize_review_date(review.get("review_date"), timestamp),
+                _parse_rating(review.get("rating")),
+                str(review.get("author") or ""),
+                str(review.get("title") or ""),
+                str(review.get("content") or ""),
+                review.get("cluster_id") or None,
+            ))
+
+        with self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO reviews"
+                " (review_key, source, ident_code, scraped_at, review_date, rating, author, title, content, cluster_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        added = cursor.rowcount
+        self._logger.info(f"Indexed {added} new of {len(rows)} {source} reviews for {ident_code}.")
+        return added
+
+    def set_cluster_ids(self, source: str, ident_code: str, reviews: Iterable[dict]) -> int:
+        """
+        Updates the near-duplicate cluster of already indexed reviews, e.g. after a cluster backfill.
+
+        Returns:
+            The number of indexed reviews that were updated.
+        """
+        rows = [
+            (review.get("cluster_id") or None, review_key(source, ident_code, review))
+            for review in reviews
+        ]
+        with self._conn:
+            cursor = self._conn.executemany("UPDATE reviews SET cluster_id = ? WHERE review_key = ?", rows)
+        return cursor.rowcount
+
+    def add_review_file(self, filepath: str) -> int:
+        """Adds a review CSV file named like `<timestamp>_<source>_reviews_<ident_code>.csv`."""
+        match = _REVIEW_FILE_PATTERN.match(os.path.basename(filepath))
+        if not match:
+            self._logger.warning(f"Skipping {filepath}, not a review file.")
+            return 0
+        with open(filepath, newline="", encoding="utf-8") as f:
+            reviews = list(csv.DictReader(f))
+        return self.add_reviews(match["source"], match["ident_code"], match["timestamp"], reviews)
+
+    def search(
+        self,
+        query: str,
+        sources: Sequence[str] | None = None,
+        ident_codes: Sequence[str] | None = None,
+        min_rating: float | None = None,
+        max_rating: float | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 20,
+    ) -> List[ReviewSearchResult]:
+        """
+        Returns the best matching reviews for an FTS5 query, ranked by BM25.
+
+        Args:
+            query (str): FTS5 query, e.g. "battery" or "battery AND (drain OR dies)".
+            sources (Sequence[str] | None): Only return reviews of these retailers.
+            ident_codes (Sequence[str] | None): Only return reviews of these products.
+            min_rating (float | None): Lowest rating to include.
+            max_rating (float | None): Highest rating to include.
+            since (str | None): Earliest review date to include (YYYY-MM-DD).
+            until (str | None): Latest review date to include (YYYY-MM-DD).
+            limit (int): Maximum number of results.
+        """
+        conditions = ["reviews_fts MATCH ?"]
+        params: list = [query]
+        if sources:
+            conditions.append(f"r.source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if ident_codes:
+            conditions.append(f"r.ident_code IN ({','.join('?' * len(ident_codes))})")
+            params.extend(ident_codes)
+        if min_rating is not None:
+            conditions.append("r.rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            conditions.append("r.rating <= ?")
+            params.append(max_rating)
+        if since:
+            conditions.append("r.review_date >= ?")
+            params.append(since)
+        if until:
+            conditions.append("r.review_date <= ?")
+            params.append(until)
+        params.append(limit)
+
+        rows = self._conn.execute(
+            "SELECT r.source, r.ident_code, r.review_date, r.rating, r.author, r.title, r.cluster_id,"
+            " snippet(reviews_fts, 1, '[', ']', '...', 16), bm25(reviews_fts) AS score"
+            " FROM reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid"
+            f" WHERE {' AND '.join(conditions)}"
+            " ORDER BY score LIMIT ?",
+            params,
+        ).fetchall()
+        return [
+            ReviewSearchResult(
+                source=source,
+                ident_code=ident_code,
+                review_date=review_date,
+                rating=rating,
+                author=author,
+                title=title,
+                cluster_id=cluster_id,
+                snippet=snippet,
+                score=score,
+            )
+            for source, ident_code, review_date, rating, author, title, cluster_id, snippet, score in rows
+        ]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@click.command()
+@click.argument("query", required=False)
+@click.option("--source", "sources", multiple=True, help="Restrict to a retailer (amazon, walmart, bestbuy).")
+@click.option("--ident-code", "ident_codes", multiple=True, help="Restrict to product code(s).")
+@click.option("--min-rating", type=float, help="Lowest rating to include.")
+@click.option("--max-rating", type=float, help="Highest rating to include.")
+@click.option("--since", type=str, help="Earliest review date to include (YYYY-MM-DD).")
+@click.option("--until", type=str, help="Latest review date to include (YYYY-MM-DD).")
+@click.option("--days", type=int, help="Only include reviews from the last N days.")
+@click.option("--limit", default=20, show_default=True, type=int, help="Maximum number of results.")
+@click.option("--index-path", default=DEFAULT_INDEX_PATH, show_default=True, type=str, help="Location of the index.")
+@click.option("--reindex", is_flag=True, help="Index every existing review CSV file under reviews/ first.")
+def search_reviews(
+    query: str | None,
+    sources: Tuple[str, ...],
+    ident_codes: Tuple[str, ...],
+    min_rating: float | None,
+    max_rating: float | None,
+    since: str | None,
+    until: str | None,
+    days: int | None,
+    limit: int,
+    index_path: str,
+    reindex: bool,
+) -> None:
+    index = ReviewSearchIndex(index_path)
+    if reindex:
+        for filepath in sorted(glob.glob(os.path.join("reviews", "*", "*_reviews_*.csv"))):
+            index.add_review_file(filepath)
+    if not query:
+        return
+    if days is not None:
+        since = (date.today() - timedelta(days=days)).isoformat()
+
+    def run_search(fts_query: str) -> List[ReviewSearchResult]:
+        return index.search(
+            fts_query,
+            sources=sources,
+            ident_codes=ident_codes,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            since=since,
+            until=until,
+            limit=limit,
+        )
+
+    try:
+        results = run_search(query)
+    except sqlite3.OperationalError:
+        # not valid FTS5 syntax, e.g. "battery-life", search the terms as plain phrases
+        try:
+            results = run_search(quote_query(query))
+        except sqlite3.OperationalError as e:
+            raise click.UsageError(
+                f"Invalid search query {query!r} ({e}). Use plain words, \"quoted phrases\", AND, OR, NOT and parentheses."
+            )
+    for result in results:
+        click.echo(
+            f"{result.score:8.3f}  {result.source:<8} {result.ident_code:<12} "
+            f"{result.review_date or '-':<10}  {result.rating if result.rating is not None else '-'}  "
+            f"{result.title}: {result.snippet}"
+        )
+    index.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    search_reviews()
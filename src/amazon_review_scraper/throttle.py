@@ -0,0 +1,258 @@
+"""
+    Module for adaptive per-retailer request concurrency and spacing.
+
+    Every response is classified as ok, blocked, captcha or throttled. A controller
+    per retailer applies an AIMD policy: after a streak of successes it allows one
+    more concurrent request and shortens the spacing between requests, and on any
+    block signal it halves the concurrency, doubles the spacing and parks all work
+    for a cool-down window. The current state is exported as JSON metrics.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+from amazon_review_scraper.exception import BaseException
+from amazon_review_scraper.models import ThrottleMetrics
+
+
+if TYPE_CHECKING:
+    import requests
+
+
+DEFAULT_METRICS_DIR = "metrics"
+
+
+class ResponseClass(str, Enum):
+    OK = "ok"
+    BLOCKED = "blocked"
+    CAPTCHA = "captcha"
+    THROTTLED = "throttled"
+
+
+# lower-cased page markers of each block signal per retailer
+BLOCK_SIGNATURES: Dict[str, Dict[ResponseClass, tuple]] = {
+    "amazon": {
+        ResponseClass.CAPTCHA: ("/errors/validatecaptcha", "type the characters you see"),
+        ResponseClass.BLOCKED: ("sorry! something went wrong", "api-services-support@amazon.com"),
+    },
+    "walmart": {
+        ResponseClass.CAPTCHA: ("px-captcha", "robot or human?"),
+        ResponseClass.BLOCKED: ("blocked?", "access denied"),
+    },
+    "bestbuy": {
+        ResponseClass.BLOCKED: ("access denied", "you don't have permission to access"),
+    },
+}
+
+# markers every regular page of the retailer contains, their absence means a bot wall
+REQUIRED_MARKERS: Dict[str, tuple] = {
+    "walmart": ("__NEXT_DATA__",),
+}
+
+# starting points and bounds of the AIMD search per retailer
+RETAILER_LIMITS: Dict[str, dict] = {
+    # reviews use a single logged-in browser session, the price matrix one browser per region
+    "amazon": {"initial_concurrency": 1, "max_concurrency": 4, "initial_delay": 2.0},
+    "walmart": {"initial_concurrency": 2, "max_concurrency": 6, "initial_delay": 1.0},
+    "bestbuy": {"initial_concurrency": 2, "max_concurrency": 6, "initial_delay": 1.0},
+}
+
+
+class ResponseBlockedError(BaseException):
+    message = "The retailer blocked or throttled the request."
+
+
+def classify_response(retailer: str, status_code: int, text: str) -> ResponseClass:
+    """Classifies a retailer response from its status code and body."""
+    # an answer to a revalidation request has no body, the cached page is still valid
+    if status_code == 304:
+        return ResponseClass.OK
+    if status_code in (429, 503):
+        return ResponseClass.THROTTLED
+    if status_code in (401, 403):
+        return ResponseClass.BLOCKED
+    required = REQUIRED_MARKERS.get(retailer, ())
+    # a complete page is fine even if a review on it happens to say "access denied"
+    if required and all(marker in text for marker in required):
+        return ResponseClass.OK
+    lowered = text.lower()
+    signatures = BLOCK_SIGNATURES.get(retailer, {})
+    for response_class in (ResponseClass.CAPTCHA, ResponseClass.BLOCKED):
+        if any(marker in lowered for marker in signatures.get(response_class, ())):
+            return response_class
+    return ResponseClass.BLOCKED if required else ResponseClass.OK
+
+
+class AdaptiveController:
+    """AIMD controller of the concurrency and request spacing for one retailer"""
+
+    def __init__(
+        self,
+        retailer: str,
+        initial_concurrency: int = 2,
+        min_concurrency: int = 1,
+        max_concurrency: int = 6,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.2,
+        max_delay: float = 30.0,
+        delay_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+        window: int = 50,
+        metrics_dir: str | None = DEFAULT_METRICS_DIR,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self._retailer = retailer
+        self._limit = float(initial_concurrency)
+        self._min_concurrency = min_concurrency
+        self._max_concurrency = max_concurrency
+        self._delay = initial_delay
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._delay_step = delay_step
+        self._decrease_factor = decrease_factor
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._metrics_path = os.path.join(metrics_dir, f"throttle_{retailer}.json") if metrics_dir else None
+        self._logger = logger if logger else logging.getLogger(__name__)
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._next_request_at = 0.0
+        self._cooldown_until = 0.0
+        self._consecutive_blocks = 0
+        self._success_streak = 0
+        self._requests = 0
+        self._outcomes: deque = deque(maxlen=window)
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    def acquire(self) -> None:
+        """Waits for a free slot outside any cool-down window and respecting the request spacing."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = max(self._cooldown_until - now, self._next_request_at - now, 0.0)
+                if self._in_flight < int(self._limit) and wait == 0.0:
+                    break
+                self._condition.wait(timeout=wait if wait > 0 else None)
+            self._in_flight += 1
+            self._requests += 1
+            self._next_request_at = time.monotonic() + self._delay
+
+    def release(self, result: ResponseClass) -> None:
+        """Frees the slot taken by acquire() and adapts the limits to the outcome of the request."""
+        with self._condition:
+            self._in_flight -= 1
+            self._outcomes.append(result)
+            if result == ResponseClass.OK:
+                self._consecutive_blocks = 0
+                self._success_streak += 1
+                # additive increase once a full window of the current concurrency succeeded
+                if self._success_streak >= max(1, int(self._limit)):
+                    self._success_streak = 0
+                    self._limit = min(float(self._max_concurrency), self._limit + 1)
+                    self._delay = max(self._min_delay, self._delay - self._delay_step)
+            else:
+                self._success_streak = 0
+                self._consecutive_blocks += 1
+                self._limit = max(float(self._min_concurrency), self._limit * self._decrease_factor)
+                self._delay = min(self._max_delay, self._delay * 2)
+                cooldown = min(self._max_cooldown, self._cooldown * 2 ** (self._consecutive_blocks - 1))
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+                self._logger.warning(
+                    f"{self._retailer}: {result.value} response, concurrency {int(self._limit)}, "
+                    f"spacing {self._delay:.1f}s, cooling down for {cooldown:.0f}s."
+                )
+            self._condition.notify_all()
+            # exported under the lock so the file never goes back to an older state
+            self._export(self._metrics())
+
+    def request(
+        self, url: str, fetch: Callable | None = None, max_attempts: int = 3, **kwargs: Any
+    ) -> "requests.Response":
+        """
+        Performs a GET request under the controller and returns the response.
+        Blocked requests and requests failing with a network error are parked until
+        the cool-down ends and retried.
+
+        Raises:
+            ResponseBlockedError: If every attempt was blocked, throttled, answered with a captcha
+                or failed with a network error.
+        """
+        if fetch is None:
+            import requests
+
+            fetch = requests.get
+        result = ResponseClass.OK
+        error: OSError | None = None
+        for _ in range(max_attempts):
+            self.acquire()
+            # a request that fails outright (reset, timeout) is treated as throttling
+            result = ResponseClass.THROTTLED
+            try:
+                response = fetch(url, **kwargs)
+                error = None
+                result = classify_response(self._retailer, response.status_code, response.text)
+            except OSError as e:
+                # requests.RequestException is an OSError
+                error = e
+                continue
+            finally:
+                self.release(result)
+            if result == ResponseClass.OK:
+                return response
+        raise ResponseBlockedError(f"{url} was answered with {result.value} {max_attempts} times.") from error
+
+    def _metrics(self) -> ThrottleMetrics:
+        outcomes = list(self._outcomes)
+        blocked = sum(1 for outcome in outcomes if outcome != ResponseClass.OK)
+        return ThrottleMetrics(
+            retailer=self._retailer,
+            concurrency_limit=int(self._limit),
+            in_flight=self._in_flight,
+            request_delay=round(self._delay, 3),
+            block_rate=round(blocked / len(outcomes), 4) if outcomes else 0.0,
+            cooldown_remaining=round(max(0.0, self._cooldown_until - time.monotonic()), 1),
+            requests=self._requests,
+        )
+
+    def metrics(self) -> ThrottleMetrics:
+        """Returns the current concurrency limit, spacing and block rate over the recent window."""
+        with self._condition:
+            return self._metrics()
+
+    def _export(self, metrics: ThrottleMetrics) -> None:
+        """Writes the metrics to a JSON file that monitoring can poll."""
+        if not self._metrics_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._metrics_path), exist_ok=True)
+            temp_path = f"{self._metrics_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(metrics.model_dump(), f)
+            os.replace(temp_path, self._metrics_path)
+        except OSError:
+            self._logger.exception(f"Unable to export throttle metrics to {self._metrics_path}.")
+
+
+_controllers: Dict[str, AdaptiveController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(retailer: str) -> AdaptiveController:
+    """Returns the process-wide controller of a retailer."""
+    with _controllers_lock:
+        if retailer not in _controllers:
+            _controllers[retailer] = AdaptiveController(retailer, **RETAILER_LIMITS.get(retailer, {}))
+        return _controllers[retailer]
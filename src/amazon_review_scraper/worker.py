@@ -0,0 +1,206 @@
+"""
+    Module for queue workers that run scrape jobs from the shared job queue.
+
+    Enqueue products once, then start `python -m amazon_review_scraper.worker work`
+    on as many machines as needed. Each worker wraps the existing per-retailer
+    scrape functions and keeps its lease alive with a background heartbeat.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+from typing import Callable, Dict, Sequence
+
+import click
+
+from amazon_review_scraper.jobqueue import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_QUEUE_PATH,
+    DEFAULT_RETRY_DELAY,
+    DEFAULT_VISIBILITY_TIMEOUT,
+    LeaseLostError,
+    SQLiteJobQueue,
+)
+from amazon_review_scraper.models import ScrapeJob
+
+
+SOURCES = ("amazon", "walmart", "bestbuy")
+
+
+def _scrape_amazon(ident_code: str, timestamp: str) -> bool:
+    from amazon_review_scraper.collector import AmazonReviewDataCollector
+
+    return AmazonReviewDataCollector().collect_amazon_review_data([ident_code], timestamp)
+
+
+def _scrape_walmart(ident_code: str, timestamp: str) -> bool:
+    from walmart_review_scraper.__main__ import scrape_product
+
+    return scrape_product(ident_code, timestamp)
+
+
+def _scrape_bestbuy(ident_code: str, timestamp: str) -> bool:
+    from bestbuy_review_scraper.__main__ import scrape_product
+
+    return scrape_product(ident_code, timestamp)
+
+
+SCRAPE_HANDLERS: Dict[str, Callable[[str, str], bool]] = {
+    "amazon": _scrape_amazon,
+    "walmart": _scrape_walmart,
+    "bestbuy": _scrape_bestbuy,
+}
+
+
+class ScrapeQueueWorker:
+    """Leases scrape jobs from the queue and runs them until the queue is drained or the worker is stopped"""
+
+    def __init__(
+        self,
+        queue_path: str = DEFAULT_QUEUE_PATH,
+        worker_id: str | None = None,
+        sources: Sequence[str] | None = None,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self._queue_path = queue_path
+        self._queue = SQLiteJobQueue(queue_path)
+        self._worker_id = worker_id if worker_id else f"{socket.gethostname()}-{os.getpid()}"
+        self._sources = list(sources) if sources else list(SOURCES)
+        self._visibility_timeout = visibility_timeout
+        self._retry_delay = retry_delay
+        self._logger = logger if logger else logging.getLogger(__name__)
+
+    def _heartbeat(self, job: ScrapeJob, stop: threading.Event) -> None:
+        """Extends the job lease every third of the visibility timeout until stopped."""
+        # SQLite connections must not be shared between threads
+        queue = SQLiteJobQueue(self._queue_path)
+        try:
+            while not stop.wait(self._visibility_timeout / 3):
+                try:
+                    queue.heartbeat(job, self._visibility_timeout)
+                except LeaseLostError:
+                    self._logger.error(f"Lost lease of job {job.id}, another worker may run it again.")
+                    return
+                except Exception:
+                    self._logger.exception(f"Heartbeat for job {job.id} failed, retrying.")
+        finally:
+            queue.close()
+
+    def run_job(self, job: ScrapeJob) -> None:
+        """Runs a single leased job and acks or nacks it."""
+        self._logger.info(
+            f"[{self._worker_id}] Running {job.source} job {job.id} for {job.ident_code} (attempt {job.attempts}).."
+        )
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+        heartbeat.start()
+        try:
+            succeeded = SCRAPE_HANDLERS[job.source](job.ident_code, job.timestamp)
+            error = None if succeeded else "scrape function reported a failure"
+        except Exception as e:
+            self._logger.exception(f"Job {job.id} failed.")
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        try:
+            if error is None:
+                self._queue.ack(job)
+            else:
+                self._queue.nack(job, error, self._retry_delay)
+        except LeaseLostError:
+            self._logger.error(f"Lease of job {job.id} expired before it finished, result not recorded.")
+
+    def run(self, exit_when_empty: bool = False, poll_interval: float = 10.0) -> None:
+        """Processes jobs until stopped, or until no job is available when `exit_when_empty` is set."""
+        self._logger.info(f"Worker {self._worker_id} started for sources {self._sources}.")
+        while True:
+            job = self._queue.lease(self._worker_id, self._visibility_timeout, self._sources)
+            if job is None:
+                if exit_when_empty:
+                    self._logger.info("No jobs available, exiting.")
+                    return
+                time.sleep(poll_interval)
+                continue
+            self.run_job(job)
+
+
+def _split_codes(ident_codes: Sequence[str]) -> list[str]:
+    return [code.strip() for value in ident_codes for code in value.split(",") if code.strip()]
+
+
+@click.group()
+@click.option(
+    "--queue-path",
+    default=DEFAULT_QUEUE_PATH,
+    show_default=True,
+    envvar="SCRAPE_QUEUE_PATH",
+    help="Location of the queue database, e.g. on a shared volume."
+)
+@click.pass_context
+def cli(ctx: click.Context, queue_path: str) -> None:
+    ctx.obj = queue_path
+
+
+@cli.command()
+@click.option("--source", required=True, type=click.Choice(SOURCES), help="Retailer to scrape.")
+@click.option(
+    "--ident-codes",
+    required=True,
+    multiple=True,
+    help="Product code(s) to scrape. A comma-separated list or multiple options."
+)
+@click.option("--timestamp", required=True, help="The timestamp string used as a prefix for output files.")
+@click.option("--max-attempts", default=DEFAULT_MAX_ATTEMPTS, show_default=True, type=int)
+@click.pass_obj
+def enqueue(queue_path: str, source: str, ident_codes: Sequence[str], timestamp: str, max_attempts: int) -> None:
+    """Adds scrape jobs to the queue."""
+    SQLiteJobQueue(queue_path).enqueue(source, _split_codes(ident_codes), timestamp, max_attempts)
+
+
+@cli.command()
+@click.option("--source", "sources", multiple=True, type=click.Choice(SOURCES), help="Only run jobs of these retailers.")
+@click.option("--worker-id", help="Worker name, defaults to <hostname>-<pid>.")
+@click.option("--visibility-timeout", default=DEFAULT_VISIBILITY_TIMEOUT, show_default=True, type=float)
+@click.option("--retry-delay", default=DEFAULT_RETRY_DELAY, show_default=True, type=float)
+@click.option("--exit-when-empty", is_flag=True, help="Exit once no job is available.")
+@click.pass_obj
+def work(
+    queue_path: str,
+    sources: Sequence[str],
+    worker_id: str | None,
+    visibility_timeout: float,
+    retry_delay: float,
+    exit_when_empty: bool,
+) -> None:
+    """Leases and runs scrape jobs."""
+    worker = ScrapeQueueWorker(
+        queue_path,
+        worker_id=worker_id,
+        sources=sources,
+        visibility_timeout=visibility_timeout,
+        retry_delay=retry_delay,
+    )
+    worker.run(exit_when_empty=exit_when_empty)
+
+
+@cli.command()
+@click.pass_obj
+def status(queue_path: str) -> None:
+    """Shows job counts per retailer and state, and the dead jobs."""
+    queue = SQLiteJobQueue(queue_path)
+    for source, counts in sorted(queue.counts().items()):
+        click.echo(f"{source}: " + ", ".join(f"{state}={count}" for state, count in sorted(counts.items())))
+    for source, ident_code, timestamp, last_error in queue.dead_jobs():
+        click.echo(f"dead: {source} {ident_code} {timestamp} ({last_error})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    cli()
@@ -1,8 +1,10 @@
-import requests
 from bs4 import BeautifulSoup
 import json
 import re
 
+from amazon_review_scraper.http_cache import CacheMissError, get_http_cache
+from amazon_review_scraper.throttle import ResponseBlockedError, get_controller
+
 HEADERS = {
     "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
     "accept": "application/json",
@@ -10,16 +12,35 @@ HEADERS = {
     "accept-encoding": "gzip, deflate, br, zstd",
 }
 
+# product pages rarely change within a run, so repeated runs and retries reuse them
+PRODUCT_PAGE_TTL = 3600
+# review pages sorted by date gain new reviews, they are only reused by retries and replays
+REVIEW_PAGE_TTL = 300
+
 site_url = "https://www.bestbuy.com"
 
 def extract_prod_reviews(review_url):
 
     with open('bestbuy_cookies.json', 'r') as f:
         cookies_dict = json.load(f)
-    response = requests.get(review_url, headers=HEADERS, cookies=cookies_dict)
+    # requests go through the adaptive controller, which parks and retries blocked requests
+    try:
+        response = get_http_cache().get(
+            review_url,
+            headers=HEADERS,
+            cookies=cookies_dict,
+            ttl=REVIEW_PAGE_TTL,
+            fetch=get_controller("bestbuy").request,
+        )
+    except (ResponseBlockedError, CacheMissError) as e:
+        print(f"Blocked by Best Buy or not cached, skipping reviews: {e}")
+        return []
     soup = BeautifulSoup(response.text, "html.parser")
 
     reviews_list= soup.find_all("li", class_="review-item")
+    if not reviews_list:
+        # possibly a bot wall served with status 200, keep it out of the cache
+        get_http_cache().invalidate(review_url)
     reviews = []
     for review in reviews_list:
         review_date = review.find("time", class_="submission-date").text
@@ -42,10 +63,26 @@ def extract_prod_info(product_url):
     
     with open('bestbuy_cookies.json', 'r') as f:
         cookies_dict = json.load(f)
-    response = requests.get(product_url, headers=HEADERS, cookies=cookies_dict)
+    try:
+        response = get_http_cache().get(
+            product_url,
+            headers=HEADERS,
+            cookies=cookies_dict,
+            ttl=PRODUCT_PAGE_TTL,
+            fetch=get_controller("bestbuy").request,
+        )
+    except (ResponseBlockedError, CacheMissError) as e:
+        print(f"Blocked by Best Buy or not cached, skipping product info: {e}")
+        return None
     soup = BeautifulSoup(response.text, "html.parser")
 
     price_script_tag = soup.find("script", id=re.compile(r'pricing-price-\d+-json'))
+    reviews_button = soup.find("div", class_="see-all-reviews-button-container")
+    if price_script_tag is None or reviews_button is None:
+        # not a regular product page, e.g. a bot wall served with status 200
+        print(f"Unexpected Best Buy product page for {product_url}")
+        get_http_cache().invalidate(product_url)
+        return None
     price_data = json.loads(price_script_tag.string)
     price_data = price_data["app"]
     item_id = price_data["priceDomain"]["skuId"]
@@ -53,7 +90,7 @@ def extract_prod_info(product_url):
     final_price = price_data["priceDomain"]["currentPrice"]
     availability = price_data["priceDomain"]["dotComDisplayStatus"]
     product_name = soup.find("div", class_="shop-product-title").find("h1").text
-    reviews_link = soup.find("div", class_="see-all-reviews-button-container").find("a")["href"]
+    reviews_link = reviews_button.find("a")["href"]
 
     return {
         "ident_code": item_id,
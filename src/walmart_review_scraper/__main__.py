@@ -2,6 +2,11 @@ import argparse
 import os
 import csv
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from amazon_review_scraper.http_cache import get_http_cache
+from amazon_review_scraper.search import ReviewSearchIndex
+from amazon_review_scraper.throttle import get_controller
 from walmart_review_scraper.scraper import extract_prod_info, extract_prod_reviews
 
 
@@ -26,6 +31,70 @@ def save_csv(data, filepath):
                 writer.writerow(row)
 
 
+def fetch_product(code):
+    """Fetches product info and reviews of one product code without saving them."""
+    print(f"Processing product code: {code}")
+    product_url = f"https://www.walmart.com/ip/{code}/"
+
+    # Extract product information
+    product_info = extract_prod_info(product_url)
+
+    # Extract reviews by iterating through pages until no more reviews are found
+    all_reviews = []
+    review_url = f"https://www.walmart.com/reviews/product/{code}?sort=submission-desc&page=1"
+    reviews = extract_prod_reviews(review_url)
+    all_reviews.extend(reviews)
+    review_url = f"https://www.walmart.com/reviews/product/{code}?sort=submission-desc&page=2"
+    reviews = extract_prod_reviews(review_url)
+    all_reviews.extend(reviews)
+
+    return product_info, all_reviews
+
+
+def save_product(code, timestamp, product_info, reviews, search_index, cluster_index):
+    """Saves product info and reviews of one product code, returns False when product info is missing."""
+    product_dir = os.path.join("products", "walmart")
+    reviews_dir = os.path.join("reviews", "walmart")
+    os.makedirs(product_dir, exist_ok=True)
+    os.makedirs(reviews_dir, exist_ok=True)
+
+    if product_info:
+        product_file = os.path.join(product_dir, f"{timestamp}_walmart_product_{code}.csv")
+        save_csv(product_info, product_file)
+        print(f"Saved product info to {product_file}")
+    else:
+        print(f"Failed to extract product info for product code {code}")
+
+    if reviews:
+        reviews_file = os.path.join(reviews_dir, f"{timestamp}_walmart_reviews_{code}.csv")
+        # tag near-duplicate and syndicated reviews with a shared cluster id
+        for review, cluster_id in zip(reviews, cluster_index.assign_clusters("walmart", code, reviews)):
+            review["cluster_id"] = cluster_id
+        save_csv(reviews, reviews_file)
+        search_index.add_reviews("walmart", code, timestamp, reviews)
+        print(f"Saved reviews to {reviews_file}")
+    else:
+        print(f"No reviews found for product code {code}")
+
+    return bool(product_info)
+
+
+def scrape_product(code, timestamp, search_index=None, cluster_index=None):
+    """Scrapes and saves product info and reviews for one product code, returns False when product info is missing."""
+    # imported here so that --help does not pay for loading numpy
+    from amazon_review_scraper.dedup import ReviewClusterIndex
+
+    product_info, reviews = fetch_product(code)
+    return save_product(
+        code,
+        timestamp,
+        product_info,
+        reviews,
+        search_index if search_index else ReviewSearchIndex(),
+        cluster_index if cluster_index else ReviewClusterIndex(),
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Walmart Review Scraper")
     parser.add_argument("--ident_code", required=True, help="Comma separated list of product codes")
@@ -35,40 +104,30 @@ def main():
     timestamp = args.timestamp
     product_codes = [code.strip() for code in args.ident_code.split(",") if code.strip()]
 
-    # Ensure output directories exist
-    product_dir = os.path.join("products", "walmart")
-    reviews_dir = os.path.join("reviews", "walmart")
-    os.makedirs(product_dir, exist_ok=True)
-    os.makedirs(reviews_dir, exist_ok=True)
+    from amazon_review_scraper.dedup import ReviewClusterIndex
+
+    search_index = ReviewSearchIndex()
+    cluster_index = ReviewClusterIndex()
+
+    # products are fetched concurrently, the Walmart controller decides how many requests are in flight.
+    # Saving stays on this thread because the SQLite indexes must not be shared between threads.
+    controller = get_controller("walmart")
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+        futures = {pool.submit(fetch_product, code): code for code in product_codes}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                product_info, reviews = future.result()
+            except Exception as e:
+                print(f"Failed to scrape product code {code}: {e}")
+                continue
+            save_product(code, timestamp, product_info, reviews, search_index, cluster_index)
+
+    metrics = controller.metrics()
+    print(f"Walmart concurrency {metrics.concurrency_limit}, block rate {metrics.block_rate:.0%}")
 
-    for code in product_codes:
-        print(f"Processing product code: {code}")
-        product_url = f"https://www.walmart.com/ip/{code}/"
-
-        # Extract product information
-        product_info = extract_prod_info(product_url)
-        if product_info:
-            product_file = os.path.join(product_dir, f"{timestamp}_walmart_product_{code}.csv")
-            save_csv(product_info, product_file)
-            print(f"Saved product info to {product_file}")
-        else:
-            print(f"Failed to extract product info for product code {code}")
-
-        # Extract reviews by iterating through pages until no more reviews are found
-        all_reviews = []
-        review_url = f"https://www.walmart.com/reviews/product/{code}?sort=submission-desc&page=1"
-        reviews = extract_prod_reviews(review_url)
-        all_reviews.extend(reviews)
-        review_url = f"https://www.walmart.com/reviews/product/{code}?sort=submission-desc&page=2"
-        reviews = extract_prod_reviews(review_url)
-        all_reviews.extend(reviews)
-
-        if all_reviews:
-            reviews_file = os.path.join(reviews_dir, f"{timestamp}_walmart_reviews_{code}.csv")
-            save_csv(all_reviews, reviews_file)
-            print(f"Saved reviews to {reviews_file}")
-        else:
-            print(f"No reviews found for product code {code}")
+    cache_stats = get_http_cache().stats()
+    print(f"HTTP cache hit ratio {cache_stats.hit_ratio:.0%}, {cache_stats.bytes_saved} bytes saved")
 
 
 if __name__ == '__main__':
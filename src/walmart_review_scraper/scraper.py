@@ -1,7 +1,9 @@
-import requests
 from bs4 import BeautifulSoup
 import json
 
+from amazon_review_scraper.http_cache import CacheMissError, get_http_cache
+from amazon_review_scraper.throttle import ResponseBlockedError, get_controller
+
 HEADERS = {
     "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
     "accept": "application/json",
@@ -9,14 +11,28 @@ HEADERS = {
     "accept-encoding": "gzip, deflate, br, zstd",
 }
 
+# product pages rarely change within a run, so repeated runs and retries reuse them
+PRODUCT_PAGE_TTL = 3600
+# review pages sorted by date gain new reviews, they are only reused by retries and replays
+REVIEW_PAGE_TTL = 300
+
 site_url = "https://www.walmart.com"
 
 def extract_prod_reviews(review_url):
-    response = requests.get(review_url, headers=HEADERS)
+    # requests go through the adaptive controller, which parks and retries blocked requests
+    try:
+        response = get_http_cache().get(
+            review_url, headers=HEADERS, ttl=REVIEW_PAGE_TTL, fetch=get_controller("walmart").request
+        )
+    except (ResponseBlockedError, CacheMissError) as e:
+        print(f"Blocked by Walmart or not cached, skipping reviews: {e}")
+        return []
     soup = BeautifulSoup(response.text, "html.parser")
     script_tag = soup.find("script", id="__NEXT_DATA__")
     if script_tag is None:
-        return None
+        # not a regular review page, keep it out of the cache
+        get_http_cache().invalidate(review_url)
+        return []
     
     data = json.loads(script_tag.string)
     initial_data = data["props"]["pageProps"]["initialData"]["data"]
@@ -39,13 +55,21 @@ def extract_prod_reviews(review_url):
     
 
 def extract_prod_info(product_url):
-    response = requests.get(product_url, headers=HEADERS)
+    try:
+        response = get_http_cache().get(
+            product_url, headers=HEADERS, ttl=PRODUCT_PAGE_TTL, fetch=get_controller("walmart").request
+        )
+    except (ResponseBlockedError, CacheMissError) as e:
+        print(f"Blocked by Walmart or not cached, skipping product info: {e}")
+        return None
 
     # use web token counter to find the value for the price or import json lib
     soup = BeautifulSoup(response.text, "html.parser")
     script_tag = soup.find("script", id="__NEXT_DATA__")
 
     if script_tag is None:
+        # not a regular product page, keep it out of the cache
+        get_http_cache().invalidate(product_url)
         return None
 
     data = json.loads(script_tag.string)
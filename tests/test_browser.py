@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from amazon_review_scraper.browser import BrowserClosedError, ManagedChromeDriver
+
+
+class FakeDriver:
+    started = 0
+
+    def __init__(self):
+        FakeDriver.started += 1
+        self.number = FakeDriver.started
+        self.cookies = []
+        self.quit_called = False
+
+    def get_cookies(self):
+        return [{"name": "session-id", "value": str(self.number), "sameSite": "Lax"}]
+
+    def get(self, url):
+        pass
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def refresh(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_recycles_after_page_limit_and_keeps_session():
+    sessions = []
+    browser = ManagedChromeDriver(FakeDriver, setup=sessions.append, max_pages=2)
+    drivers = [browser.checkpoint() for _ in range(5)]
+
+    first = drivers[0].number
+    assert [driver.number - first for driver in drivers] == [0, 0, 1, 1, 2]
+    assert len(sessions) == 1
+    assert drivers[0].quit_called
+    assert drivers[2].cookies == [{"name": "session-id", "value": str(drivers[0].number)}]
+    assert browser.recycles == 2
+    browser.quit()
+
+
+def test_no_browser_starts_after_quit():
+    browser = ManagedChromeDriver(FakeDriver)
+    driver = browser.checkpoint()
+    browser.quit()
+    started = FakeDriver.started
+
+    assert driver.quit_called
+    with pytest.raises(BrowserClosedError):
+        browser.checkpoint()
+    with pytest.raises(BrowserClosedError):
+        browser.recycle()
+    assert FakeDriver.started == started
+
+
+def test_quit_does_not_wait_for_session_setup():
+    setup_started = threading.Event()
+    release_setup = threading.Event()
+
+    def slow_setup(driver):
+        setup_started.set()
+        release_setup.wait(5)
+
+    browser = ManagedChromeDriver(FakeDriver, setup=slow_setup)
+    starter = threading.Thread(target=browser.start)
+    starter.start()
+    assert setup_started.wait(5)
+
+    quitter = threading.Thread(target=browser.quit)
+    quitter.start()
+    quitter.join(1)
+    assert not quitter.is_alive()
+
+    release_setup.set()
+    starter.join(5)
+    with pytest.raises(BrowserClosedError):
+        browser.checkpoint()
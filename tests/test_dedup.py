@@ -0,0 +1,98 @@
+import csv
+import random
+import sqlite3
+
+from click.testing import CliRunner
+
+from amazon_review_scraper.dedup import ReviewClusterIndex, _shingles, backfill_clusters
+from amazon_review_scraper.search import ReviewSearchIndex
+
+
+SYNDICATED = (
+    "I bought this standing desk for my home office and the motor is quiet, "
+    "the frame is sturdy and it was easy to assemble in under an hour."
+)
+EDITED_COPY = SYNDICATED.replace("under an hour", "under one hour!")
+UNRELATED = (
+    "The blender leaks from the bottom seal after two weeks of daily smoothies, "
+    "and customer service keeps sending me the same replacement gasket."
+)
+
+
+def make_review(author, content):
+    return {"author": author, "review_date": "2025-01-02", "title": "Review", "content": content}
+
+
+def test_edited_copies_share_a_cluster_across_products(tmp_path):
+    index = ReviewClusterIndex(str(tmp_path / "clusters.sqlite3"))
+    first = index.assign_clusters("walmart", "1", [make_review("Ann", SYNDICATED), make_review("Bob", UNRELATED)])
+    second = index.assign_clusters("bestbuy", "2", [make_review("Ann", EDITED_COPY)])
+
+    assert second[0] == first[0]
+    assert first[1] != first[0]
+    # known reviews keep their cluster
+    assert index.assign_clusters("walmart", "1", [make_review("Ann", SYNDICATED)]) == first[:1]
+
+
+def jaccard(first, second):
+    first, second = _shingles(first), _shingles(second)
+    return len(first & second) / len(first | second)
+
+
+def test_pairs_just_above_the_threshold_are_clustered(tmp_path):
+    rng = random.Random(3)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8))) for _ in range(2000)]
+    pairs = []
+    while len(pairs) < 50:
+        text = [rng.choice(words) for _ in range(40)]
+        edited = [word if rng.random() > 0.15 else rng.choice(words) for word in text]
+        if 0.58 <= jaccard(" ".join(text), " ".join(edited)) <= 0.68:
+            pairs.append((" ".join(text), " ".join(edited)))
+
+    index = ReviewClusterIndex(str(tmp_path / "clusters.sqlite3"), threshold=0.5)
+    clustered = sum(
+        index.assign_clusters("walmart", str(i), [make_review("Ann", text)])
+        == index.assign_clusters("bestbuy", str(i), [make_review("Bob", edited)])
+        for i, (text, edited) in enumerate(pairs)
+    )
+    assert clustered >= 47
+
+
+def test_bands_are_rebuilt_for_indexes_built_with_other_bands(tmp_path):
+    path = str(tmp_path / "clusters.sqlite3")
+    first = ReviewClusterIndex(path).assign_clusters("walmart", "1", [make_review("Ann", SYNDICATED)])
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM lsh_bands")
+        conn.execute("UPDATE settings SET value = 16 WHERE name = 'num_bands'")
+
+    second = ReviewClusterIndex(path).assign_clusters("bestbuy", "2", [make_review("Ann", EDITED_COPY)])
+    assert second == first
+
+
+def test_short_generic_reviews_are_not_clustered(tmp_path):
+    index = ReviewClusterIndex(str(tmp_path / "clusters.sqlite3"))
+    first = index.assign_clusters("amazon", "A", [make_review("Ann", "Great product!"), make_review("Cy", "Love it")])
+    second = index.assign_clusters("walmart", "1", [make_review("Bob", "Great product!"), make_review("Dee", "")])
+
+    assert len(set(first + second)) == 4
+
+
+def test_backfill_writes_cluster_ids_to_files_and_search_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reviews" / "walmart").mkdir(parents=True)
+    filepath = tmp_path / "reviews" / "walmart" / "202501010000_walmart_reviews_1.csv"
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["author", "review_date", "title", "content", "rating"])
+        writer.writeheader()
+        writer.writerow(dict(make_review("Ann", SYNDICATED), rating="5"))
+        writer.writerow(dict(make_review("Bob", EDITED_COPY), rating="4"))
+    search_index = ReviewSearchIndex()
+    search_index.add_review_file(str(filepath))
+
+    result = CliRunner().invoke(backfill_clusters, [])
+
+    assert result.exit_code == 0, result.output
+    with open(filepath, newline="", encoding="utf-8") as f:
+        cluster_ids = [row["cluster_id"] for row in csv.DictReader(f)]
+    assert cluster_ids[0] and cluster_ids[0] == cluster_ids[1]
+    assert {hit.cluster_id for hit in search_index.search("desk")} == {cluster_ids[0]}
@@ -0,0 +1,89 @@
+import pytest
+
+from amazon_review_scraper.enrichment import (
+    EnrichmentCache,
+    ReviewEnricher,
+    _aspect_sentences,
+    review_content_hash,
+)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Works with my Xbox.",
+        "Tastes like chocolate.",
+        "Ideal for a small room.",
+        "Bought it at Costco.",
+        "The plate is heavy.",
+    ],
+)
+def test_aspect_keywords_match_whole_words_only(content):
+    assert _aspect_sentences(content) == {}
+
+
+def test_aspect_sentences_grouped_by_aspect():
+    content = "The box was crushed and it arrived late. Great deal for $20! Support never answered."
+    assert _aspect_sentences(content) == {
+        "shipping": "The box was crushed and it arrived late.",
+        "price": "Great deal for $20!",
+        "support": "Support never answered.",
+    }
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    assert review_content_hash("Great  product\n") == review_content_hash("great product")
+    assert review_content_hash("great product") != review_content_hash("great product", "other-model")
+
+
+class StubEnricher(ReviewEnricher):
+    """Scores a text by whether it contains "good", counting every scored text"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.scored = []
+
+    def _load_model(self):
+        return None, None
+
+    def _score(self, texts):
+        self.scored.extend(texts)
+        return [0.9 if "good" in text.lower() else 0.1 for text in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EnrichmentCache(str(tmp_path / "enrichment.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_batches_stay_within_token_budget():
+    enricher = ReviewEnricher(cache=object(), max_length=8, max_batch_tokens=16)
+    input_ids = [[0] * length for length in (3, 8, 1, 5, 8, 2, 4, 7)]
+    batches = enricher._make_batches(input_ids)
+
+    assert sorted(index for batch in batches for index in batch) == list(range(len(input_ids)))
+    for batch in batches:
+        assert max(len(input_ids[i]) for i in batch) * len(batch) <= 16
+
+
+def test_cached_results_are_not_scored_again(cache):
+    enricher = StubEnricher(cache=cache)
+    first = enricher.enrich(["A good kettle.", "Leaks everywhere."])
+    scored = len(enricher.scored)
+
+    second = StubEnricher(cache=cache).enrich(["A good kettle.", "Leaks everywhere."])
+    assert scored == 2
+    assert second == first
+
+
+def test_results_keep_input_order_with_partial_cache_hits(cache):
+    StubEnricher(cache=cache).enrich(["Leaks everywhere."])
+    enricher = StubEnricher(cache=cache)
+    results = enricher.enrich(["A good kettle.", "Leaks everywhere.", "Good value for the price."])
+
+    assert enricher.scored == ["A good kettle.", "Good value for the price.", "Good value for the price."]
+    assert [result.sentiment for result in results] == ["positive", "negative", "positive"]
+    assert results[1].content_hash == review_content_hash("Leaks everywhere.")
+    assert results[2].aspects == {"price": "positive"}
@@ -0,0 +1,75 @@
+import random
+import string
+
+import pytest
+import requests
+
+from amazon_review_scraper.http_cache import CacheMissError, HTTPResponseCache
+
+
+def make_response(status_code, text=""):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode("utf-8")
+    response.encoding = "utf-8"
+    return response
+
+
+def make_cache(tmp_path, **kwargs):
+    options = {"max_bytes": 2 ** 20, "default_ttl": 3600}
+    options.update(kwargs)
+    return HTTPResponseCache(str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_fresh_entry_is_served_without_request(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+
+    def fetch(url, **kwargs):
+        calls.append(url)
+        return make_response(200, "page")
+
+    assert cache.get("https://example.com/a", fetch=fetch).text == "page"
+    assert cache.get("https://example.com/a", fetch=fetch).text == "page"
+    assert len(calls) == 1
+    assert cache.stats().hits == 1
+
+
+def test_replay_mode_serves_cache_and_never_fetches(tmp_path):
+    make_cache(tmp_path).get("https://example.com/a", ttl=0, fetch=lambda url, **kwargs: make_response(200, "page"))
+    replay = make_cache(tmp_path, mode="replay")
+
+    def fetch(url, **kwargs):
+        raise AssertionError("replay mode must not fetch")
+
+    assert replay.get("https://example.com/a", fetch=fetch).text == "page"
+    with pytest.raises(CacheMissError):
+        replay.get("https://example.com/b", fetch=fetch)
+
+
+def test_invalidated_page_is_fetched_again(tmp_path):
+    cache = make_cache(tmp_path)
+    pages = iter(["bot wall", "product"])
+
+    def fetch(url, **kwargs):
+        return make_response(200, next(pages))
+
+    assert cache.get("https://example.com/a", fetch=fetch).text == "bot wall"
+    cache.invalidate("https://example.com/a")
+    assert cache.get("https://example.com/a", fetch=fetch).text == "product"
+    assert cache.get("https://example.com/a", fetch=fetch).text == "product"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=3000)
+    # random bodies barely compress, only two of them fit
+    rng = random.Random(1)
+    bodies = {name: "".join(rng.choices(string.ascii_letters, k=1400)) for name in "abc"}
+    for name, body in bodies.items():
+        cache.get(f"https://example.com/{name}", fetch=lambda url, body=body, **kwargs: make_response(200, body))
+
+    def fetch(url, **kwargs):
+        return make_response(200, "refetched")
+
+    assert cache.get("https://example.com/c", fetch=fetch).text == bodies["c"]
+    assert cache.get("https://example.com/a", fetch=fetch).text == "refetched"
@@ -0,0 +1,54 @@
+import pytest
+
+from amazon_review_scraper.jobqueue import LeaseLostError, SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    yield queue
+    queue.close()
+
+
+def test_enqueue_skips_duplicates(queue):
+    assert queue.enqueue("walmart", ["1", "2"], "202501010000") == 2
+    assert queue.enqueue("walmart", ["2", "3"], "202501010000") == 1
+    assert queue.counts() == {"walmart": {"queued": 3}}
+
+
+def test_lease_ack(queue):
+    queue.enqueue("bestbuy", ["6447382"], "202501010000")
+    job = queue.lease("worker-1", sources=["bestbuy"])
+    assert job.ident_code == "6447382"
+    assert job.attempts == 1
+    assert queue.lease("worker-2") is None
+    queue.heartbeat(job)
+    queue.ack(job)
+    assert queue.counts() == {"bestbuy": {"done": 1}}
+
+
+def test_lease_filters_sources(queue):
+    queue.enqueue("amazon", ["B0D1XD1ZV3"], "202501010000")
+    assert queue.lease("worker-1", sources=["walmart"]) is None
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    queue.enqueue("walmart", ["1"], "202501010000")
+    first = queue.lease("worker-1", visibility_timeout=-1)
+    second = queue.lease("worker-2")
+    assert second.id == first.id
+    assert second.attempts == 2
+    with pytest.raises(LeaseLostError):
+        queue.ack(first)
+    queue.ack(second)
+
+
+def test_nack_retries_then_marks_dead(queue):
+    queue.enqueue("walmart", ["1"], "202501010000", max_attempts=2)
+    job = queue.lease("worker-1")
+    queue.nack(job, "blocked", retry_delay=0)
+    job = queue.lease("worker-1")
+    assert job.attempts == 2
+    queue.nack(job, "blocked again", retry_delay=0)
+    assert queue.lease("worker-1") is None
+    assert queue.dead_jobs() == [("walmart", "1", "202501010000", "blocked again")]
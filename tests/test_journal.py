@@ -0,0 +1,56 @@
+from amazon_review_scraper.journal import RunJournal
+from amazon_review_scraper.models import Product, Review
+
+
+PRODUCT = Product(ident_code="B0D1XD1ZV3", name="Desk", base_price=199.0, final_price=149.0, inventory_status="In Stock")
+
+
+def make_review(title):
+    return Review(
+        author="Ann",
+        content="Sturdy desk.",
+        rating=5,
+        title=title,
+        review_date="Reviewed in the United States on January 2, 2025",
+        verified_purchase=True,
+        helpful_text="2 people found this helpful",
+    )
+
+
+def test_resumes_from_stored_progress(tmp_path):
+    journal = RunJournal.for_timestamp("202501010000", directory=str(tmp_path))
+    journal.record_attempt("B0D1XD1ZV3")
+    journal.record_product("B0D1XD1ZV3", PRODUCT)
+    journal.record_review_page("B0D1XD1ZV3", [make_review("page 1")])
+
+    resumed = RunJournal.for_timestamp("202501010000", directory=str(tmp_path))
+    assert resumed.product("B0D1XD1ZV3") == PRODUCT
+    assert resumed.review_pages_done("B0D1XD1ZV3") == 1
+    assert not resumed.reviews_complete("B0D1XD1ZV3")
+    assert resumed.pending(["B0D1XD1ZV3"]) == ["B0D1XD1ZV3"]
+
+    resumed.record_review_page("B0D1XD1ZV3", [make_review("page 2")])
+    resumed.mark_reviews_complete("B0D1XD1ZV3")
+    resumed.mark_done("B0D1XD1ZV3")
+    assert [review.title for review in resumed.reviews("B0D1XD1ZV3")] == ["page 1", "page 2"]
+    assert journal.pending(["B0D1XD1ZV3"]) == []
+
+
+def test_writers_of_different_asins_keep_each_others_progress(tmp_path):
+    first = RunJournal.for_timestamp("202501010000", directory=str(tmp_path))
+    second = RunJournal.for_timestamp("202501010000", directory=str(tmp_path))
+    first.mark_done("B0D1XD1ZV3")
+    second.mark_failed("B0BXYCS74H", "ProductInfoError: no price")
+
+    journal = RunJournal.for_timestamp("202501010000", directory=str(tmp_path))
+    assert journal.pending(["B0D1XD1ZV3", "B0BXYCS74H"]) == ["B0BXYCS74H"]
+    assert journal.status("B0BXYCS74H") == "failed"
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_in_memory_journal_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = RunJournal()
+    journal.record_attempt("B0D1XD1ZV3")
+    assert journal.record_attempt("B0D1XD1ZV3") == 2
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,101 @@
+from selenium.common.exceptions import NoSuchElementException
+
+from amazon_review_scraper.journal import STATUS_FAILED, RunJournal
+from amazon_review_scraper.models import Product
+from amazon_review_scraper.scraper import AmazonReviewScraper
+
+
+class FakeDriver:
+    def get_cookies(self):
+        raise RuntimeError("browser crashed")
+
+    def quit(self):
+        pass
+
+
+class FakeScraper(AmazonReviewScraper):
+    """Fails every scrape of FAILING, and fails to start the browser that replaces the first one"""
+
+    FAILING = "B000000001"
+
+    def __init__(self):
+        super().__init__()
+        self.launches = 0
+
+    def _init_chrome_driver(self):
+        self.launches += 1
+        if self.launches == 2:
+            raise RuntimeError("chromedriver did not start")
+        return FakeDriver()
+
+    def _start_session(self, driver):
+        pass
+
+    def _logout_from_amazon(self, driver):
+        pass
+
+    def _scrape_asin(self, browser, asin_code, journal):
+        browser.checkpoint()
+        if asin_code == self.FAILING:
+            raise RuntimeError("product page did not load")
+        product = Product(ident_code=asin_code, name="Kettle", base_price=30.0, final_price=25.0, inventory_status="In Stock")
+        return product, []
+
+
+def test_failed_browser_restart_does_not_end_the_run():
+    scraper = FakeScraper()
+    journal = RunJournal()
+    results = list(scraper.scrape_amazon_products_and_reviews([FakeScraper.FAILING, "B000000002"], journal, max_attempts=2))
+
+    assert [asin_code for asin_code, _, _ in results] == ["B000000002"]
+    assert journal.status(FakeScraper.FAILING) == STATUS_FAILED
+    assert scraper.launches == 3
+
+
+def test_no_attempts_marks_failed():
+    journal = RunJournal()
+    assert FakeScraper()._scrape_asin_with_retries(None, FakeScraper.FAILING, journal, max_attempts=0) is None
+    assert journal.status(FakeScraper.FAILING) == STATUS_FAILED
+
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+    def get_attribute(self, name):
+        return self.text
+
+
+class FakePage:
+    def __init__(self, elements):
+        self._elements = elements
+
+    def find_element(self, by, value):
+        if value not in self._elements:
+            raise NoSuchElementException(value)
+        return FakeElement(self._elements[value])
+
+    def find_elements(self, by, value):
+        return [FakeElement(self._elements[value])] if value in self._elements else []
+
+
+def test_region_product_info_reads_prices_and_availability():
+    page = FakePage({
+        "productTitle": "Kettle",
+        ".basisPrice .a-offscreen": "$1,299.99",
+        ".priceToPay span.a-price-whole": "1,049.",
+        ".priceToPay span.a-price-fraction": "50",
+        "availability": "In Stock ",
+    })
+    product = AmazonReviewScraper()._get_region_product_info(page, "B000000002", "94103")
+
+    assert (product.base_price, product.final_price, product.inventory_status) == (1299.99, 1049.5, "In Stock")
+    assert product.region == "94103"
+
+
+def test_unavailable_region_keeps_availability_without_prices():
+    page = FakePage({"productTitle": "Kettle", "availability": "Currently unavailable."})
+    product = AmazonReviewScraper()._get_region_product_info(page, "B000000002", "99501")
+
+    assert (product.base_price, product.final_price) == (None, None)
+    assert product.inventory_status == "Currently unavailable."
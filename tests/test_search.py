@@ -0,0 +1,63 @@
+import pytest
+
+from click.testing import CliRunner
+
+from amazon_review_scraper.search import ReviewSearchIndex, normalize_review_date, search_reviews
+
+
+REVIEWS = [
+    {"author": "Ann", "review_date": "3/12/2025", "title": "Battery", "content": "Great battery life, lasts two days.", "rating": "5"},
+    {"author": "Bob", "review_date": "January 2, 2025", "title": "Meh", "content": "The screen scratches easily.", "rating": 2},
+]
+
+
+@pytest.mark.parametrize(
+    ("review_date", "expected"),
+    [
+        ("Reviewed in the United States on March 3, 2025", "2025-03-03"),
+        ("Sept. 3, 2024", None),
+        ("Sep 3, 2024", "2024-09-03"),
+        ("3/12/2025", "2025-03-12"),
+        ("2025-01-31T10:00:00Z", "2025-01-31"),
+        ("2 months ago", "2024-11-01"),
+        ("2/30/2025", None),
+        ("", None),
+    ],
+)
+def test_normalize_review_date(review_date, expected):
+    assert normalize_review_date(review_date, "202412310000") == expected
+
+
+def test_add_reviews_is_idempotent_and_searchable(tmp_path):
+    index = ReviewSearchIndex(str(tmp_path / "index.sqlite3"))
+    assert index.add_reviews("walmart", "1", "202503150000", REVIEWS) == 2
+    assert index.add_reviews("walmart", "1", "202503150000", REVIEWS) == 0
+
+    results = index.search("battery", min_rating=4)
+    assert [(r.author, r.review_date) for r in results] == [("Ann", "2025-03-12")]
+    assert index.search("battery", max_rating=3) == []
+
+
+def test_relative_dates_do_not_duplicate_reviews(tmp_path):
+    index = ReviewSearchIndex(str(tmp_path / "index.sqlite3"))
+    review = {"author": "Cat", "review_date": "2 months ago", "title": "Loud", "content": "The fan is loud."}
+    assert index.add_reviews("bestbuy", "6447382", "202501010000", [review]) == 1
+    assert index.add_reviews("bestbuy", "6447382", "202502010000", [{**review, "review_date": "3 months ago"}]) == 0
+    assert len(index.search("fan")) == 1
+
+
+def test_cli_searches_hyphenated_terms_as_phrases(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    index = ReviewSearchIndex(path)
+    index.add_reviews("walmart", "1", "202503150000", REVIEWS)
+    index.close()
+
+    result = CliRunner().invoke(search_reviews, ["battery-life", "--index-path", path])
+    assert result.exit_code == 0, result.output
+    assert "Battery" in result.output
+
+
+def test_cli_reports_invalid_queries(tmp_path):
+    result = CliRunner().invoke(search_reviews, [" ", "--index-path", str(tmp_path / "index.sqlite3")])
+    assert result.exit_code == 2
+    assert "Invalid search query" in result.output
@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+from amazon_review_scraper.http_cache import HTTPResponseCache
+from amazon_review_scraper.throttle import (
+    AdaptiveController,
+    ResponseBlockedError,
+    ResponseClass,
+    classify_response,
+)
+
+
+WALMART_PAGE = '<html><script id="__NEXT_DATA__">{}</script></html>'
+
+
+def make_response(status_code, text="", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode("utf-8")
+    response.encoding = "utf-8"
+    response.headers.update(headers or {})
+    return response
+
+
+def make_controller(retailer="walmart"):
+    return AdaptiveController(retailer, initial_delay=0.0, min_delay=0.0, cooldown=0.0, metrics_dir=None)
+
+
+@pytest.mark.parametrize(
+    ("retailer", "status_code", "text", "expected"),
+    [
+        ("walmart", 200, WALMART_PAGE, ResponseClass.OK),
+        ("walmart", 200, "<html>Robot or human?</html>", ResponseClass.CAPTCHA),
+        ("walmart", 200, "<html></html>", ResponseClass.BLOCKED),
+        ("walmart", 304, "", ResponseClass.OK),
+        ("walmart", 429, WALMART_PAGE, ResponseClass.THROTTLED),
+        ("bestbuy", 403, "", ResponseClass.BLOCKED),
+        ("bestbuy", 200, "<html></html>", ResponseClass.OK),
+        ("amazon", 200, "<form action='/errors/validateCaptcha'>", ResponseClass.CAPTCHA),
+    ],
+)
+def test_classify_response(retailer, status_code, text, expected):
+    assert classify_response(retailer, status_code, text) == expected
+
+
+def test_controller_backs_off_on_blocks_and_recovers():
+    controller = make_controller()
+    controller.acquire()
+    controller.release(ResponseClass.BLOCKED)
+    assert controller.metrics().concurrency_limit == 1
+    assert controller.metrics().request_delay == 0.0
+    for _ in range(3):
+        controller.acquire()
+        controller.release(ResponseClass.OK)
+    assert controller.metrics().concurrency_limit > 1
+
+
+def test_controller_raises_after_repeated_blocks():
+    controller = make_controller()
+    with pytest.raises(ResponseBlockedError):
+        controller.request("https://www.walmart.com/ip/1", fetch=lambda url, **kwargs: make_response(403))
+    assert controller.metrics().requests == 3
+
+
+def test_revalidated_page_is_not_treated_as_block(tmp_path):
+    cache = HTTPResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=2 ** 20, default_ttl=3600)
+    controller = make_controller()
+    sent_headers = []
+
+    def fetch(url, headers=None, cookies=None):
+        sent_headers.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return make_response(304)
+        return make_response(200, WALMART_PAGE, {"ETag": '"v1"'})
+
+    url = "https://www.walmart.com/ip/1"
+    first = cache.get(url, headers={}, ttl=0, fetch=lambda url, **kwargs: controller.request(url, fetch=fetch, **kwargs))
+    second = cache.get(url, headers={}, ttl=0, fetch=lambda url, **kwargs: controller.request(url, fetch=fetch, **kwargs))
+
+    assert sent_headers[-1]["If-None-Match"] == '"v1"'
+    assert first.text == second.text == WALMART_PAGE
+    assert cache.stats().revalidated == 1
+    assert controller.metrics().block_rate == 0.0
+
+
+def test_controller_retries_network_errors():
+    controller = make_controller()
+    responses = iter([requests.ConnectionError("reset"), make_response(200, WALMART_PAGE)])
+
+    def fetch(url, **kwargs):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert controller.request("https://www.walmart.com/ip/1", fetch=fetch).text == WALMART_PAGE
+    assert controller.metrics().requests == 2
+
+
+def test_controller_raises_after_repeated_network_errors():
+    controller = make_controller()
+
+    def fetch(url, **kwargs):
+        raise requests.Timeout("timed out")
+
+    with pytest.raises(ResponseBlockedError):
+        controller.request("https://www.walmart.com/ip/1", fetch=fetch)
+    assert controller.metrics().requests == 3
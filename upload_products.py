@@ -1,7 +1,7 @@
 import argparse
+import csv
 import glob
 import os
-import pandas as pd
 import requests
 
 WEBHOOK_URL = "https://auto.uncleben006.site/webhook/f69a9e9b-db3b-47ad-a63f-3a37442a3f86"
@@ -13,6 +13,13 @@ def post_to_webhook(data):
     else:
         print(f"Failed to post {data['id']} - Response: {response.text}")
 
+def to_number(value):
+    # keep prices numeric in the payload, as they were when read with pandas
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
 def process_csv_files(timestamp):
     csv_files = glob.glob(f'products/*/{timestamp}_*.csv')
     
@@ -21,19 +28,21 @@ def process_csv_files(timestamp):
         return
     
     for csv_file in csv_files:
-        df = pd.read_csv(csv_file)
+        # the csv module is enough for these one-row files and avoids importing pandas at startup
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
         ident_code = csv_file.split("_")[-1].split(".")[0]
         source = csv_file.split("/")[1]
         
-        for _, row in df.iterrows():
+        for row in rows:
             payload = {
                 "source": source,
                 "id": f"{timestamp}_{ident_code}",
                 "timestamp": timestamp,
                 "product ident code": ident_code,
                 "product name": row.get("name"),
-                "base price": row.get("base_price"),
-                "final price": row.get("final_price"),
+                "base price": to_number(row.get("base_price")),
+                "final price": to_number(row.get("final_price")),
                 "inventory status": row.get("inventory_status"),
             }
         # print(payload)